@@ -40,6 +40,7 @@ async def main_async(args):
     logger = setup_logging(dev_mode=args.dev)
     logger.info("Starting unified bot initialization")
 
+    bot = None
     try:
         token = os.getenv('DISCORD_BOT_TOKEN')
 
@@ -60,6 +61,7 @@ async def main_async(args):
         )
         # Store the command-line flag on the bot instance so cogs can access it
         bot.summary_now = args.summary_now
+        bot.batch_summaries = args.batch
 
         # ---- BASIC EVENT TEST ----
         @bot.event
@@ -131,13 +133,24 @@ async def main_async(args):
         logger.info("Received keyboard interrupt, shutting down...")
     except Exception as e:
         logger.error(f"Error running unified bot: {e}")
-        logger.debug(traceback.format_exc())
+        logger.debug("Full traceback", exc_info=True)
         sys.exit(1)
+    finally:
+        # Close the bot ourselves so its connections shut down before asyncio.run
+        # cancels and gathers whatever background tasks are left
+        # Close errors are only logged so they can't mask the original failure
+        if bot is not None and not bot.is_closed():
+            try:
+                await bot.close()
+            except Exception as e:
+                logger.error(f"Error closing bot: {e}")
+                logger.debug("Full traceback", exc_info=True)
 
 def main():
     parser = argparse.ArgumentParser(description='Unified Discord Bot')
     parser.add_argument('--summary-now', action='store_true', help='Run the summary process immediately')
     parser.add_argument('--dev', action='store_true', help='Run in development mode')
+    parser.add_argument('--batch', action='store_true', help='Use the Claude Message Batches API for scheduled summaries')
     args = parser.parse_args()
 
     # Get the directory containing main.py
@@ -395,14 +395,7 @@ class MessageArchiver(BaseDiscordBot):
                 # Also archive any threads in this channel if it's a text channel
                 if isinstance(channel, discord.TextChannel):
                     logger.info(f"Checking for threads in #{channel.name}")
-                    # Archive archived threads
-                    async for thread in channel.archived_threads():
-                        logger.info(f"Starting archive of thread #{thread.name} in {channel.name}")
-                        await self.archive_channel(thread.id)
-                    # Archive active threads
-                    for thread in channel.threads:
-                        logger.info(f"Starting archive of active thread #{thread.name} in {channel.name}")
-                        await self.archive_channel(thread.id)
+                    await self.archive_threads(channel)
             else:
                 # Archive all text channels in the guild
                 for channel in guild.text_channels:
@@ -420,30 +413,14 @@ class MessageArchiver(BaseDiscordBot):
                     if forum.id not in self.skip_channels:
                         logger.info(f"Starting archive of forum channel #{forum.name}")
                         # Archive the forum posts (threads)
-                        thread_count = 0
-                        async for thread in forum.archived_threads():
-                            thread_count += 1
-                            logger.info(f"Starting archive of forum thread #{thread.name} in {forum.name}")
-                            await self.archive_channel(thread.id)
-                        # Archive active threads
-                        for thread in forum.threads:
-                            thread_count += 1
-                            logger.info(f"Starting archive of active forum thread #{thread.name} in {forum.name}")
-                            await self.archive_channel(thread.id)
+                        thread_count = await self.archive_threads(forum)
                         logger.info(f"Processed {thread_count} total threads in forum #{forum.name}")
                 
                 # Archive threads in text channels
                 for channel in guild.text_channels:
                     if channel.id not in self.skip_channels:
                         logger.info(f"Checking for threads in #{channel.name}")
-                        # Archive archived threads
-                        async for thread in channel.archived_threads():
-                            logger.info(f"Starting archive of thread #{thread.name} in {channel.name}")
-                            await self.archive_channel(thread.id)
-                        # Archive active threads
-                        for thread in channel.threads:
-                            logger.info(f"Starting archive of active thread #{thread.name} in {channel.name}")
-                            await self.archive_channel(thread.id)
+                        await self.archive_threads(channel)
             
             logger.info("Archiving complete, shutting down bot")
             logger.info(f"Total new messages archived across all channels: {self.total_messages_archived}")
@@ -453,6 +430,37 @@ class MessageArchiver(BaseDiscordBot):
             logger.error(f"Error in on_ready: {e}")
             await self.close()
 
+    async def archive_threads(self, parent, workers: int = 5) -> int:
+        """
+        Archive every archived and active thread of a text or forum channel.
+        Threads are archived as the archived-thread pages arrive rather than after the
+        whole listing has been fetched. Returns the number of threads processed.
+        """
+        threads: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        count = 0
+
+        async def produce():
+            nonlocal count
+            try:
+                async for thread in parent.archived_threads():
+                    count += 1
+                    await threads.put((thread, "thread"))
+                for thread in parent.threads:
+                    count += 1
+                    await threads.put((thread, "active thread"))
+            finally:
+                for _ in range(workers):
+                    await threads.put(None)
+
+        async def consume():
+            while (item := await threads.get()) is not None:
+                thread, kind = item
+                logger.info(f"Starting archive of {kind} #{thread.name} in {parent.name}")
+                await self.archive_channel(thread.id)
+
+        await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+        return count
+
     async def _wait_for_rate_limit(self):
         """Handles rate limiting for Discord API calls."""
         now = datetime.now()
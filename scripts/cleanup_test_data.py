@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 import asyncio
+import aiohttp
 import logging
 from dotenv import load_dotenv, set_key
 import os
@@ -51,10 +52,15 @@ def main():
     bot = ChannelCleaner()
 
     async def cleanup():
+        # Bounded connector instead of discord.py's unlimited default; BaseDiscordBot.close() closes it
+        bot.http.connector = aiohttp.TCPConnector(
+            limit=30,
+            limit_per_host=10,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True
+        )
         try:
             await bot.start(token)
-        except KeyboardInterrupt:
-            await bot.close()
         finally:
             await bot.close()
 
@@ -72,19 +78,37 @@ def main():
             channels_to_clean.append(dev_summary.strip())
         channels_to_clean.extend([ch.strip() for ch in dev_channels if ch.strip()])
         
-        # Process all dev channels
-        for channel_id in channels_to_clean:
-            try:
+        # Process all dev channels concurrently, bounded to stay within Discord's rate limits.
+        # Per-channel problems are logged and skipped; anything fatal (e.g. a revoked token)
+        # escapes clean_one and the TaskGroup cancels the remaining channels.
+        async def clean_one(channel_id):
+            async with bot.cleanup_semaphore:
                 channel = bot.get_channel(int(channel_id))
                 if not channel:
-                    logger.error(f"Could not find channel with ID {channel_id}")
-                    continue
+                    logger.error("Could not find channel with ID %s", channel_id)
+                    return 0
+
+                logger.info("Cleaning messages from channel: #%s", channel.name)
+                try:
+                    async with asyncio.timeout(300):
+                        deleted = await bot.delete_messages(channel)
+                except TimeoutError:
+                    logger.error("Timed out cleaning #%s", channel.name)
+                    return 0
+                except (discord.Forbidden, discord.NotFound) as e:
+                    logger.error("Error cleaning channel %s: %s", channel_id, e)
+                    return 0
+                logger.info("Deleted %d messages from #%s", deleted, channel.name)
+                return deleted
 
-                logger.info(f"Cleaning messages from channel: #{channel.name}")
-                deleted = await bot.delete_messages(channel)
-                logger.info(f"Deleted {deleted} messages from #{channel.name}")
-            except Exception as e:
-                logger.error(f"Error cleaning channel {channel_id}: {e}")
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(clean_one(c), name=f"clean-{c}") for c in channels_to_clean]
+            total_deleted = sum(task.result() for task in tasks)
+            logger.info(f"Deleted {total_deleted} messages across {len(channels_to_clean)} channels")
+        except* Exception as eg:
+            for e in eg.exceptions:
+                logger.error(f"Cleanup aborted: {e}")
 
         await bot.close()
 
@@ -106,49 +130,33 @@ class ChannelCleaner(BaseDiscordBot):
             logger=logger
         )
         self.target_user_id = 301463647895683072
+        self.cleanup_semaphore = asyncio.Semaphore(5)
 
     async def delete_messages(self, channel):
         """Delete all messages from a channel."""
         deleted_count = 0
         try:
-            messages = []
-            async for message in channel.history(limit=None):
-                if message.author.id in [self.user.id, self.target_user_id]:
-                    messages.append(message)
-
-            if not messages:
-                logger.info(f"No messages to delete in #{channel.name}")
-                return 0
-
-            logger.info(f"Found {len(messages)} messages to delete in #{channel.name}")
-            
-            # Try bulk deletion first
-            if len(messages) > 1:
-                try:
-                    chunks = [messages[i:i + 100] for i in range(0, len(messages), 100)]
-                    for chunk in chunks:
-                        await channel.delete_messages(chunk)
-                        deleted_count += len(chunk)
-                        await asyncio.sleep(1)
-                except Exception as e:
-                    logger.error(f"Bulk deletion failed: {e}")
-                    # Fall back to individual deletion
-                    deleted_count = 0
-                    for message in messages:
-                        try:
-                            await message.delete()
-                            deleted_count += 1
-                            await asyncio.sleep(1)
-                        except Exception as e:
-                            logger.error(f"Failed to delete message {message.id}: {e}")
-            else:
-                # Single message case
-                await messages[0].delete()
-                deleted_count = 1
-
+            # purge() bulk-deletes in chunks of 100 and falls back to single deletes for
+            # messages older than Discord's 14-day bulk-delete limit
+            author_ids = frozenset((self.user.id, self.target_user_id))
+            deleted = await channel.purge(
+                limit=None,
+                check=lambda m: m.author.id in author_ids,
+                bulk=True,
+                reason="Test data cleanup"
+            )
+            deleted_count = len(deleted)
+            if not deleted_count:
+                logger.info("No messages to delete in #%s", channel.name)
+            return deleted_count
+        except discord.HTTPException as e:
+            if e.status == 401:
+                # Bad or revoked token: nothing else will succeed either
+                raise
+            logger.error("Error cleaning channel #%s: %s", channel.name, e)
             return deleted_count
         except Exception as e:
-            logger.error(f"Error cleaning channel #{channel.name}: {e}")
+            logger.error("Error cleaning channel #%s: %s", channel.name, e)
             return deleted_count
 
 if __name__ == "__main__":
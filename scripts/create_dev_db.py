@@ -48,74 +48,60 @@ def main():
         dev_db = DatabaseHandler(dev_db_path, dev_mode=True)
         dev_db.close()
         
-        # Connect to both databases
-        src = sqlite3.connect(prod_db_path)
-        dst = sqlite3.connect(dev_db_path)
+        # Copy inside the dev database with the production one attached, so rows never pass through Python
+        dst = sqlite3.connect(dev_db_path, isolation_level=None)
         
-        # Enable foreign keys
-        src.execute("PRAGMA foreign_keys = ON")
+        # Enable foreign keys and speed up the bulk insert
         dst.execute("PRAGMA foreign_keys = ON")
+        dst.execute("PRAGMA synchronous = NORMAL")
+        dst.execute("PRAGMA temp_store = MEMORY")
+        dst.execute("PRAGMA cache_size = -200000")
+        dst.execute("ATTACH DATABASE ? AS src", (prod_db_path,))
         
         try:
             # Calculate cutoff date (24 hours ago)
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=1)
             logger.info(f"Will copy data after: {cutoff_date}")
             
-            # First get all channels and members
-            channels = src.execute("SELECT channel_id FROM channels").fetchall()
-            channel_ids = {chan[0] for chan in channels}
+            # One transaction for the whole copy
+            dst.execute("BEGIN")
             
-            members = src.execute("SELECT member_id FROM members").fetchall()
-            member_ids = {mem[0] for mem in members}
-            
-            # Get messages from the last 24 hours, but only from existing channels and members
-            messages = src.execute(f"""
-                SELECT * FROM messages 
-                WHERE created_at > ?
-                AND channel_id IN ({','.join('?' * len(channel_ids))})
-                AND author_id IN ({','.join('?' * len(member_ids))})
-            """, [cutoff_date.isoformat()] + list(channel_ids) + list(member_ids)).fetchall()
-            
-            if not messages:
-                logger.error("No messages found in the specified time range")
-                sys.exit(1)
-                
-            logger.info(f"Found {len(messages)} messages to copy")
-            
-            # Get unique channel IDs and member IDs from the filtered messages
-            message_channel_ids = {msg[1] for msg in messages}  # channel_id is at index 1
-            message_member_ids = {msg[2] for msg in messages}   # author_id is at index 2
+            # Messages from the last 24 hours, but only from existing channels and members.
+            # SQLite streams each INSERT...SELECT row by row, so the message set is never held in memory.
+            recent_messages = """
+                FROM src.messages
+                WHERE created_at > :cutoff
+                AND channel_id IN (SELECT channel_id FROM src.channels)
+                AND author_id IN (SELECT member_id FROM src.members)
+            """
+            params = {"cutoff": cutoff_date.isoformat()}
             
             # Copy only the channels we need
-            channels = src.execute(f"""
-                SELECT * FROM channels 
-                WHERE channel_id IN ({','.join('?' * len(message_channel_ids))})
-            """, list(message_channel_ids)).fetchall()
-            
-            dst.executemany("""
-                INSERT INTO channels VALUES (?,?,?,?,?,?,?,?,?)
-            """, channels)
-            logger.info(f"Copied {len(channels)} channels")
+            cursor = dst.execute(f"""
+                INSERT INTO channels
+                SELECT * FROM src.channels
+                WHERE channel_id IN (SELECT channel_id {recent_messages})
+            """, params)
+            logger.info(f"Copied {cursor.rowcount} channels")
             
             # Then copy only the members we need
-            members = src.execute(f"""
-                SELECT * FROM members 
-                WHERE member_id IN ({','.join('?' * len(message_member_ids))})
-            """, list(message_member_ids)).fetchall()
-            
-            dst.executemany("""
-                INSERT INTO members VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """, members)
-            logger.info(f"Copied {len(members)} members")
+            cursor = dst.execute(f"""
+                INSERT INTO members
+                SELECT * FROM src.members
+                WHERE member_id IN (SELECT author_id {recent_messages})
+            """, params)
+            logger.info(f"Copied {cursor.rowcount} members")
             
             # Finally copy messages
-            dst.executemany("""
-                INSERT INTO messages VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """, messages)
-            logger.info(f"Copied {len(messages)} messages")
+            cursor = dst.execute(f"INSERT INTO messages SELECT * {recent_messages}", params)
+            if not cursor.rowcount:
+                logger.error("No messages found in the specified time range")
+                dst.execute("ROLLBACK")
+                sys.exit(1)
+            logger.info(f"Copied {cursor.rowcount} messages")
             
             # Commit changes
-            dst.commit()
+            dst.execute("COMMIT")
             
             # Verify
             count = dst.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
@@ -125,10 +111,10 @@ def main():
             
         except Exception as e:
             logger.error(f"Error copying data: {e}")
-            dst.rollback()
+            if dst.in_transaction:
+                dst.execute("ROLLBACK")
             raise
         finally:
-            src.close()
             dst.close()
         
     except Exception as e:
@@ -3,9 +3,8 @@
 import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, Any, Dict
+from typing import Optional
 import random
-import traceback
 import os
 
 import discord
@@ -34,6 +33,9 @@ class BaseDiscordBot(commands.Bot):
         # For Summarizer Cog to track if we've run the immediate summary
         self.summarizer_ready = False
 
+        self.add_listener(self._record_session, "on_ready")
+        self.add_listener(self._log_resumed, "on_resumed")
+
     async def setup_hook(self):
         """
         Called before the bot starts running. Removed custom health-check tasks.
@@ -51,67 +53,41 @@ class BaseDiscordBot(commands.Bot):
     async def close(self):
         """Clean up resources on shutdown."""
         try:
-            # Ensure HTTP session is cleaned up (if it's still open).
-            if hasattr(self.http, "_session") and self.http._session:
-                await self.http._session.close()
-
+            # Closes the gateway and the HTTP session, which owns (and closes) its connector
             await super().close()
+            # Give SSL transports a moment to shut down cleanly
+            await asyncio.sleep(0.25)
         except Exception as e:
             self.logger.error(f"Error during bot shutdown: {str(e)}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Full traceback", exc_info=True)
             raise
 
     # -------------------------------------------------------------------------
-    # The following method is optional. It logs certain gateway events
-    # (op=9, code=4004, etc.), but *no longer* forces reconnections or modifies
-    # your bot's connection state. You can remove this entire method if you
-    # don't need these logs.
+    # Session bookkeeping runs off discord.py's READY/RESUMED events rather than
+    # inspecting every gateway frame. discord.py itself handles invalid sessions
+    # and raises on auth failures (4004), so those need no handling here.
+    # Registered as extra listeners so subclasses overriding on_ready keep them.
     # -------------------------------------------------------------------------
-    async def on_socket_response(self, msg: Dict[str, Any]) -> None:
-        """Handle WebSocket responses for errors/resumptions."""
-        if not isinstance(msg, dict):
-            return
-        try:
-            op_code = msg.get("op")
-            event_type = msg.get("t")
-
-            # Log invalid session
-            if op_code == 9:  # Invalid session
-                self.logger.error(f"Invalid session detected - Full message: {msg}")
-                self._failed_session_count += 1
-                self._last_session_id = None
-
-            # Log auth failure
-            elif msg.get("code") == 4004:  # Auth failure
-                self.logger.critical(
-                    "Authentication failed - bot token may be invalid. "
-                    "Please check your token and try again."
-                )
-                await self.close()
-
-            # Log new session
-            elif event_type == "READY":
-                session_id = msg.get("session_id")
-                self._last_session_id = session_id
-                self._session_start_time = datetime.now()
-                self._failed_session_count = 0
-                self.logger.info(
-                    f"New session established - ID: {session_id}, "
-                    f"Start time: {self._session_start_time.isoformat()}"
-                )
-
-            # Log resumed session
-            elif event_type == "RESUMED":
-                self.logger.info(
-                    f"Session resumed successfully - ID: {self._last_session_id}, "
-                    f"Failed attempts: {self._failed_session_count}"
-                )
-                self._failed_session_count = 0
-
-        except Exception as e:
-            self.logger.error(f"Error processing socket response: {str(e)}")
-            self.logger.debug(f"Message that caused error: {msg}")
-            self.logger.debug(traceback.format_exc())
+    async def _record_session(self) -> None:
+        """Record the session established by the latest READY."""
+        session_id = getattr(self.ws, "session_id", None)
+        # A fresh READY replacing an earlier session means that session couldn't be resumed
+        if session_id != self._last_session_id and self._last_session_id is not None:
+            self._failed_session_count += 1
+        self._last_session_id = session_id
+        self._session_start_time = datetime.now()
+        self.logger.info(
+            f"New session established - ID: {session_id}, "
+            f"Start time: {self._session_start_time.isoformat()}"
+        )
+
+    async def _log_resumed(self) -> None:
+        """Log a successfully resumed session."""
+        self.logger.info(
+            f"Session resumed successfully - ID: {self._last_session_id}, "
+            f"Failed attempts: {self._failed_session_count}"
+        )
+        self._failed_session_count = 0
 
     async def on_ready(self):
         """When the bot is fully connected."""
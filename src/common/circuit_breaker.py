@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from src.common.errors import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker (CLOSED -> OPEN -> HALF_OPEN).
+
+    Opens after failure_threshold consecutive failures and rejects calls until the
+    recovery window passes, then lets a single trial call through. Each time the
+    trial fails the recovery window doubles, up to max_recovery_timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 max_recovery_timeout: float = 600.0,
+                 is_failure: Optional[Callable[[BaseException], bool]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.recovery_timeout = recovery_timeout
+        # Decides which exceptions count against the provider (e.g. 5xx yes, 403 no)
+        self.is_failure = is_failure or (lambda e: True)
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go through right now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        # HALF_OPEN: only one trial call at a time
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed again")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+        self.recovery_timeout = self.base_recovery_timeout
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN:
+            self.recovery_timeout = min(self.recovery_timeout * 2, self.max_recovery_timeout)
+            self._open()
+        elif self.state == self.CLOSED and self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+        logger.warning(f"Circuit '{self.name}' opened for {self.recovery_timeout:.0f}s after {self._failures} consecutive failures")
+
+    async def __aenter__(self):
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.record_success()
+        elif isinstance(exc_val, asyncio.CancelledError):
+            # A cancelled trial says nothing about the provider; let the next call try again
+            self._trial_in_flight = False
+        elif self.is_failure(exc_val):
+            self.record_failure()
+        else:
+            # The provider answered (e.g. a 4xx), so it's healthy
+            self.record_success()
+        return False
@@ -1,14 +1,21 @@
 import os
 import logging
 import asyncio
+import random
 import traceback
 from typing import List, Dict, Any, Optional, Union
 
 import anthropic
 from dotenv import load_dotenv
 
+from src.common.circuit_breaker import CircuitBreaker
+from src.common.errors import CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
+# Transient statuses worth retrying: timeout, rate limit, server errors and overload
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+
 class ClaudeClient:
     """A centralized client for interacting with the Anthropic Claude API."""
 
@@ -22,17 +29,27 @@ class ClaudeClient:
         try:
             # Using AsyncAnthropic for compatibility with async discord bots
             self.client = anthropic.AsyncAnthropic(api_key=api_key)
+            # Cap concurrent generations and back off from Claude while it's overloaded
+            self.bulkhead = asyncio.Semaphore(4)
+            self.breaker = CircuitBreaker('claude', is_failure=self._is_provider_failure)
             logger.info("Anthropic Claude client initialized successfully.")
         except Exception as e:
             logger.error(f"Failed to initialize Anthropic client: {e}", exc_info=True)
             raise
 
+    @staticmethod
+    def _is_provider_failure(error: BaseException) -> bool:
+        if isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError, asyncio.TimeoutError)):
+            return True
+        return isinstance(error, anthropic.APIStatusError) and error.status_code >= 500
+
     async def generate_text(
         self,
         content: Union[str, List[Dict]], 
         model: str = "claude-3-5-sonnet-latest", 
         max_tokens: int = 8192, 
-        system_prompt: Optional[str] = None,
+        system_prompt: Optional[Union[str, List[Dict]]] = None,
+        temperature: Optional[float] = None,
         max_retries: int = 3,
         retry_delay_seconds: int = 5
     ) -> Optional[str]:
@@ -44,7 +61,8 @@ class ClaudeClient:
             content: The main user prompt (string) or a list of content blocks (for multimodal).
             model: The Claude model identifier.
             max_tokens: The maximum number of tokens to generate.
-            system_prompt: An optional system prompt.
+            system_prompt: An optional system prompt, as a string or a list of content blocks (e.g. with cache_control).
+            temperature: Optional sampling temperature; the API default is used when None.
             max_retries: Maximum number of retries on API errors.
             retry_delay_seconds: Delay between retries.
 
@@ -70,42 +88,119 @@ class ClaudeClient:
         }
         if system_prompt:
             api_kwargs["system"] = system_prompt
+        if temperature is not None:
+            api_kwargs["temperature"] = temperature
 
         for attempt in range(max_retries):
             try:
-                # Use **api_kwargs to pass parameters
-                response = await self.client.messages.create(**api_kwargs) 
+                # Stream the response so long generations yield to the event loop between chunks
+                chunks = []
+                async with self.bulkhead, self.breaker:
+                    async with self.client.messages.stream(**api_kwargs) as stream:
+                        async for text in stream.text_stream:
+                            chunks.append(text)
+                        response = await stream.get_final_message()
                 
-                if response.content and response.content[0].text:
-                    return response.content[0].text.strip()
+                usage = getattr(response, 'usage', None)
+                if usage is not None and system_prompt:
+                    logger.debug(f"Claude prompt cache for {model}: read {getattr(usage, 'cache_read_input_tokens', 0)}, created {getattr(usage, 'cache_creation_input_tokens', 0)} tokens")
+                
+                text = "".join(chunks).strip()
+                if text:
+                    return text
                 else:
                     logger.warning(f"Claude response content is empty for model {model}. Attempt {attempt + 1}/{max_retries}")
                     if attempt == max_retries - 1:
                         return None # Failed after all retries
+            except CircuitOpenError as e:
+                logger.warning(f"Skipping Claude call for model {model}: {e}")
+                return None
+            except asyncio.TimeoutError as e:
+                logger.warning(f"Claude call timed out (Attempt {attempt + 1}/{max_retries}): {e}")
             except anthropic.APIConnectionError as e:
                 logger.warning(f"Claude API connection error (Attempt {attempt + 1}/{max_retries}): {e}")
-            except anthropic.RateLimitError as e:
-                logger.warning(f"Claude rate limit exceeded (Attempt {attempt + 1}/{max_retries}): {e}")
             except anthropic.APIStatusError as e:
-                logger.error(f"Claude API status error (Attempt {attempt + 1}/{max_retries}): {e.status_code} - {e.response}")
-                if e.status_code >= 500: # Retry on server errors (5xx)
-                    pass # Continue to retry logic below
-                else: # Don't retry on client errors (4xx)
-                    return None 
-            except anthropic.BadRequestError as e:
-                 logger.error(f"Claude Bad Request Error (non-retryable): {e}")
-                 # Consider logging prompt details carefully, masking sensitive info
-                 # logger.debug(f"Failed content (first 100 chars): {str(content)[:100]}...")
-                 return None # Bad request, likely prompt issue, don't retry
+                if e.status_code not in RETRYABLE_STATUS_CODES:
+                    # Bad request, auth, not found etc. won't succeed on a retry
+                    logger.error(f"Claude API status error (non-retryable): {e.status_code} - {e}")
+                    return None
+                logger.warning(f"Claude API status error (Attempt {attempt + 1}/{max_retries}): {e.status_code} - {e.response}")
             except Exception as e:
-                logger.error(f"An unexpected error occurred while calling Claude (Attempt {attempt + 1}/{max_retries}): {e}", exc_info=True)
+                logger.error(f"An unexpected error occurred while calling Claude (non-retryable): {e}", exc_info=True)
+                return None
             
             # Retry logic
             if attempt < max_retries - 1:
-                logger.info(f"Retrying Claude call in {retry_delay_seconds} seconds...")
-                await asyncio.sleep(retry_delay_seconds)
+                # Exponential backoff with jitter so concurrent callers don't retry in lockstep
+                delay = retry_delay_seconds * 2 ** attempt + random.random()
+                logger.info(f"Retrying Claude call in {delay:.1f} seconds...")
+                await asyncio.sleep(delay)
             else:
                 logger.error(f"Claude call failed after {max_retries} attempts for model {model}.")
                 return None # Failed after all retries
 
-        return None # Fallback return 
\ No newline at end of file
+        return None # Fallback return 
+
+
+class ClaudeBatchRunner:
+    """Runs many independent prompts as a single Message Batches job (half price, no per-call latency)."""
+
+    def __init__(self, claude_client: ClaudeClient, poll_interval_seconds: int = 30, timeout_seconds: int = 2 * 60 * 60):
+        self.client = claude_client.client
+        self.poll_interval_seconds = poll_interval_seconds
+        self.timeout_seconds = timeout_seconds
+
+    async def run(
+        self,
+        prompts: Dict[str, Union[str, List[Dict]]],
+        model: str = "claude-3-5-sonnet-latest",
+        max_tokens: int = 8192,
+        system_prompt: Optional[Union[str, List[Dict]]] = None,
+        temperature: Optional[float] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        Submit one request per prompt and wait for the batch to finish.
+
+        Args:
+            prompts: Mapping of custom_id to user prompt (a string or a list of content blocks).
+            model: The Claude model identifier.
+            max_tokens: The maximum number of tokens to generate per request.
+            system_prompt: An optional system prompt shared by every request.
+            temperature: Optional sampling temperature for every request.
+
+        Returns:
+            Mapping of custom_id to generated text, or None for requests that failed.
+        """
+        requests = []
+        for custom_id, content in prompts.items():
+            params = {
+                "model": model,
+                "max_tokens": max_tokens,
+                "messages": [{"role": "user", "content": content}]
+            }
+            if system_prompt:
+                params["system"] = system_prompt
+            if temperature is not None:
+                params["temperature"] = temperature
+            requests.append({"custom_id": custom_id, "params": params})
+
+        batch = await self.client.messages.batches.create(requests=requests)
+        logger.info(f"Submitted Claude batch {batch.id} with {len(requests)} requests.")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_seconds
+        while batch.processing_status != "ended":
+            if loop.time() > deadline:
+                logger.error(f"Claude batch {batch.id} did not finish within {self.timeout_seconds}s, cancelling.")
+                await self.client.messages.batches.cancel(batch.id)
+                return {custom_id: None for custom_id in prompts}
+            await asyncio.sleep(self.poll_interval_seconds)
+            batch = await self.client.messages.batches.retrieve(batch.id)
+
+        results: Dict[str, Optional[str]] = {custom_id: None for custom_id in prompts}
+        async for entry in await self.client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded" and entry.result.message.content:
+                results[entry.custom_id] = entry.result.message.content[0].text.strip()
+            else:
+                logger.warning(f"Claude batch request {entry.custom_id} did not succeed: {entry.result.type}")
+        return results
@@ -172,6 +172,16 @@ class DatabaseHandler:
                 )
             """)
             
+            # Generated social media captions, so a retried share skips Claude
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS share_captions (
+                    message_id BIGINT PRIMARY KEY,
+                    title TEXT,
+                    description TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             # Messages table with FTS support
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS messages (
@@ -417,12 +427,14 @@ class DatabaseHandler:
         def update_thread_operation(conn):
             cursor = conn.cursor()
             try:
-                # First, delete any existing entries for this channel for the current month
+                # First, delete any existing entries for this channel for the current month.
+                # A created_at range (rather than strftime) lets this use the (channel_id, created_at) key.
                 cursor.execute(
                     """
                     DELETE FROM channel_summary 
                     WHERE channel_id = ? 
-                    AND strftime('%Y-%m', created_at) = strftime('%Y-%m', CURRENT_TIMESTAMP)
+                    AND created_at >= datetime('now', 'start of month')
+                    AND created_at < datetime('now', 'start of month', '+1 month')
                     """,
                     (channel_id,)
                 )
@@ -516,6 +528,35 @@ class DatabaseHandler:
             
         return self._execute_with_retry(get_member_operation)
 
+    def get_cached_caption(self, message_id: int) -> Optional[Dict]:
+        """Get the generated title and description stored for a shared message."""
+        def get_caption_operation(conn):
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT title, description
+                FROM share_captions
+                WHERE message_id = ?
+            """, (message_id,))
+            result = cursor.fetchone()
+            cursor.close()
+            return dict(result) if result else None
+            
+        return self._execute_with_retry(get_caption_operation)
+
+    def set_cached_caption(self, message_id: int, title: str, description: str) -> bool:
+        """Store the generated title and description for a shared message."""
+        def set_caption_operation(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO share_captions (message_id, title, description)
+                VALUES (?, ?, ?)
+            """, (message_id, title, description))
+            cursor.close()
+            return True
+            
+        return self._execute_with_retry(set_caption_operation)
+
     def message_exists(self, message_id: int) -> bool:
         """Check if a message exists in the database."""
         def check_message_operation(conn):
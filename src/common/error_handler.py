@@ -15,7 +15,7 @@ def handle_errors(operation_name: str):
                 return await func(*args, **kwargs)
             except Exception as e:
                 logger.error(f"Error in {operation_name}: {e}")
-                logger.debug(traceback.format_exc())
+                logger.debug("Full traceback", exc_info=True)
                 # If first arg is a discord.Client or commands.Bot instance, try to notify admin
                 if args and isinstance(args[0], discord.Client):
                     bot = args[0]
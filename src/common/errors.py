@@ -28,4 +28,8 @@ class MediaProcessingError(ChannelSummarizerError):
 
 class DatabaseError(ChannelSummarizerError):
     """Raised when database operations fail"""
-    pass
\ No newline at end of file
+    pass
+
+class CircuitOpenError(APIError):
+    """Raised when a call is rejected because the provider's circuit breaker is open"""
+    pass
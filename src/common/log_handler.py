@@ -1,6 +1,10 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
+import queue
+import shutil
+import tempfile
 from typing import Optional
 
 class LineCountRotatingFileHandler(RotatingFileHandler):
@@ -10,12 +14,32 @@ class LineCountRotatingFileHandler(RotatingFileHandler):
         super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
         self.max_lines = max_lines
         
-        # Initialize line count from existing file
+        # Cache whether the target is a regular file so shouldRollover doesn't stat on every emit
+        self._base_is_regular = os.path.isfile(self.baseFilename) if os.path.exists(self.baseFilename) else True
+        
+        # Initialize line count and size from existing file
         if os.path.exists(filename):
-            with open(filename, 'r', encoding=encoding or 'utf-8') as f:
-                self.line_count = sum(1 for _ in f)
+            self.line_count = self._estimate_line_count(self.baseFilename)
+            self._approx_size = os.path.getsize(self.baseFilename)
         else:
             self.line_count = 0
+            self._approx_size = 0
+        # Length of the record last checked by shouldRollover, added to _approx_size once written
+        self._pending_size = 0
+    
+    @staticmethod
+    def _estimate_line_count(path, sample_size=4096):
+        """Count lines exactly for small files, otherwise extrapolate from the newline density of the tail"""
+        size = os.path.getsize(path)
+        if size == 0:
+            return 0
+        sample = min(size, sample_size)
+        with open(path, 'rb') as f:
+            f.seek(size - sample)
+            buf = f.read(sample)
+        if sample == size:
+            return buf.count(b'\n')
+        return int(size * buf.count(b'\n') / sample)
     
     def doRollover(self):
         """Override doRollover to keep last N lines"""
@@ -23,22 +47,56 @@ class LineCountRotatingFileHandler(RotatingFileHandler):
             self.stream.close()
             self.stream = None
             
-        if self.max_lines:
-            # Read all lines from the current file
-            with open(self.baseFilename, 'r', encoding=self.encoding) as f:
-                lines = f.readlines()
-            
-            # Keep only the last max_lines
-            lines = lines[-self.max_lines:]
+        if self.max_lines and os.path.exists(self.baseFilename):
+            # Read only the tail of the file instead of every line
+            lines = self._read_tail_lines(self.max_lines)
             
-            # Write the last max_lines back to the file
-            with open(self.baseFilename, 'w', encoding=self.encoding) as f:
-                f.writelines(lines)
+            # Write the last max_lines to a temp file and swap it in atomically
+            log_dir = os.path.dirname(self.baseFilename) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=log_dir, prefix='.rollover-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.writelines(lines)
+                shutil.copymode(self.baseFilename, tmp_path)
+                os.replace(tmp_path, self.baseFilename)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
             
             self.line_count = len(lines)
         
         if not self.delay:
             self.stream = self._open()
+        
+        self._base_is_regular = os.path.isfile(self.baseFilename) if os.path.exists(self.baseFilename) else True
+        self._approx_size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+    
+    def _read_tail_lines(self, max_lines, block_size=64 * 1024):
+        """Return the last max_lines lines of the log file, reading backwards in blocks"""
+        with open(self.baseFilename, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            buf = b''
+            # One extra newline so a partially read first line gets dropped
+            while pos > 0 and buf.count(b'\n') <= max_lines:
+                read_size = min(block_size, pos)
+                pos -= read_size
+                f.seek(pos)
+                buf = f.read(read_size) + buf
+        return buf.splitlines(keepends=True)[-max_lines:]
+    
+    def shouldRollover(self, record):
+        """Size-based rollover check using tracked sizes instead of stat/seek/tell calls"""
+        if not self._base_is_regular:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0:
+            self._pending_size = len(self.format(record)) + 1
+            if self._approx_size + self._pending_size >= self.maxBytes:
+                return True
+        return False
     
     def emit(self, record):
         """Emit a record and check line count"""
@@ -47,6 +105,8 @@ class LineCountRotatingFileHandler(RotatingFileHandler):
             
         super().emit(record)
         self.line_count += 1
+        self._approx_size += self._pending_size
+        self._pending_size = 0
 
 class LogHandler:
     """Handles logging configuration with separate files for dev/prod and rotation"""
@@ -67,6 +127,8 @@ class LogHandler:
         self.prod_log_file = prod_log_file
         self.dev_log_file = dev_log_file
         self.logger = None
+        self._queue_listener: Optional[QueueListener] = None
+        atexit.register(self._stop_queue_listener)
 
     def setup_logging(self, dev_mode: bool = False) -> logging.Logger:
         """
@@ -89,6 +151,8 @@ class LogHandler:
             
             # Clear any existing handlers
             logger.handlers.clear()
+            self._stop_queue_listener()
+            file_handlers = []
             
             # Prevent propagation to avoid duplicate logs
             logger.propagate = False
@@ -122,7 +186,7 @@ class LogHandler:
                 prod_handler.setLevel(logging.INFO)  # Keep INFO level for production logs
                 prod_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
                 prod_handler.setFormatter(prod_formatter)
-                logger.addHandler(prod_handler)
+                file_handlers.append(prod_handler)
             except Exception as e:
                 print(f"Failed to setup production log file handler: {e}")
                 console_handler.error(f"Failed to setup production log file handler: {e}")
@@ -144,14 +208,18 @@ class LogHandler:
                 if os.path.exists(self.dev_log_file):
                     if os.path.getsize(self.dev_log_file) > 512 * 1024:
                         dev_handler.doRollover()
-                    else:
-                        # Count lines in existing file
-                        with open(self.dev_log_file, 'r', encoding='utf-8') as f:
-                            line_count = sum(1 for _ in f)
-                        if line_count > 200:
-                            dev_handler.doRollover()
+                    elif dev_handler.line_count > 200:
+                        # Line count was already computed when the handler opened the file
+                        dev_handler.doRollover()
                 
-                logger.addHandler(dev_handler)
+                file_handlers.append(dev_handler)
+            
+            # Write files from a background thread so log calls don't block on disk I/O
+            if file_handlers:
+                log_queue = queue.SimpleQueue()
+                self._queue_listener = QueueListener(log_queue, *file_handlers, respect_handler_level=True)
+                self._queue_listener.start()
+                logger.addHandler(QueueHandler(log_queue))
             
             # Log startup info - critical setup logs always show
             logger.info(f"Logging configured in {'development' if dev_mode else 'production'} mode")
@@ -174,6 +242,12 @@ class LogHandler:
         """Get the configured logger instance."""
         return self.logger 
 
+    def _stop_queue_listener(self):
+        """Drain queued records to the file handlers and stop the writer thread"""
+        if self._queue_listener:
+            self._queue_listener.stop()
+            self._queue_listener = None
+
     def _verify_file_writable(self, filepath):
         """Verify that we can write to the log file"""
         try:
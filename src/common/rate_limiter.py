@@ -1,82 +1,251 @@
 import discord
+import aiohttp
 import asyncio
+import collections
 import random
 import logging
-import traceback
+import time
 
 class RateLimiter:
-    """Manages rate limiting for Discord API calls with exponential backoff."""
-    
-    def __init__(self):
-        self.backoff_times = {}  # Store backoff times per channel
-        self.base_delay = 1.0    # Base delay in seconds
-        self.max_delay = 64.0    # Maximum delay in seconds
-        self.jitter = 0.1        # Random jitter factor
+    """
+    Manages rate limiting for Discord API calls with an adaptive (AIMD) token bucket per key.
+    Calls are admitted through weighted fair queuing across keys so a busy key can't starve the rest.
+    """
+
+    def __init__(self, concurrency: int = 16):
+        self.rates = {}          # Current token refill rate (tokens/sec) per key
+        self.tokens = {}         # Available tokens per key (negative = reserved)
+        self.last_refill = {}    # Monotonic timestamp of last refill per key
+        self.initial_rate = 1.0  # Starting rate in tokens/sec
+        self.min_rate = 0.1      # Floor for the rate after repeated 429s
+        self.max_rate = 10.0     # Ceiling for the rate after repeated successes
+        self.increase = 0.5      # Additive increase on success
+        self.decrease = 0.5      # Multiplicative decrease on 429/5xx
+        self.burst = 5.0         # Maximum tokens that can accumulate
+        self.jitter = 0.1        # Random jitter factor applied to retry cool-downs
+        self.low_remaining = 0.1 # Slow down proactively at <=10% of the bucket remaining
+        self.limits = {}         # Fixed (rate, burst) per key; these keys skip AIMD adjustment
         self.logger = logging.getLogger('ChannelSummarizer')  # Initialize logger
-    
+
+        # Weighted fair queuing state
+        self.weights = {}                               # Share per key (default 1)
+        self._queues = {}                               # Pending (job, future) per key
+        self._finish_times = {}                         # Virtual finish time per key
+        self._virtual_time = 0.0
+        self._slots = asyncio.Semaphore(concurrency)    # Global concurrency budget
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+
+    def set_weight(self, key, weight: float):
+        """Give key a larger (or smaller) share of the concurrency budget."""
+        self.weights[key] = weight
+
+    def set_limit(self, key, rate: float, burst: float):
+        """Pin key to a fixed rate (tokens/sec) and burst, for endpoints with a known quota."""
+        self.limits[key] = (rate, burst)
+        self.rates[key] = rate
+
+    def _burst(self, key):
+        return self.limits[key][1] if key in self.limits else self.burst
+
+    def _available(self, key, now):
+        """Tokens key would have after refilling up to now."""
+        rate = self.rates.get(key, self.initial_rate)
+        elapsed = now - self.last_refill.get(key, now)
+        burst = self._burst(key)
+        return min(burst, self.tokens.get(key, burst) + elapsed * rate)
+
+    def _take_token(self, key, now):
+        """Refill key's bucket up to now and spend one token."""
+        self.tokens[key] = self._available(key, now) - 1
+        self.last_refill[key] = now
+
+    def _on_success(self, key):
+        """Additively increase the rate for key."""
+        if key in self.limits:
+            return
+        self.rates[key] = min(self.max_rate, self.rates.get(key, self.initial_rate) + self.increase)
+
+    def _on_throttle(self, key):
+        """Multiplicatively decrease the rate for key."""
+        if key in self.limits:
+            return
+        self.rates[key] = max(self.min_rate, self.rates.get(key, self.initial_rate) * self.decrease)
+
+    def _nearly_exhausted(self, error):
+        """Check the rate limit headers on a failed response for a nearly empty bucket."""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return False
+        try:
+            remaining = headers.get('X-RateLimit-Remaining')
+            limit = headers.get('X-RateLimit-Limit')
+            if remaining is None or not limit:
+                return False
+            return float(remaining) / float(limit) <= self.low_remaining
+        except (TypeError, ValueError):
+            return False
+
     async def execute(self, key, coroutine_or_factory):
         """
         Executes a coroutine or coroutine factory with rate limit handling.
-        
+
+        The call is queued under key and dispatched in weighted fair order
+        against calls for other keys.
+
         Args:
             key: Identifier for the rate limit (e.g., channel_id)
             coroutine_or_factory: The coroutine or factory function to execute
-            
+
         Returns:
             The result of the coroutine execution
         """
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(key, (coroutine_or_factory, future, 0))
+        return await future
+
+    def _enqueue(self, key, entry, front=False):
+        queue = self._queues.setdefault(key, collections.deque())
+        if front:
+            queue.appendleft(entry)
+        else:
+            queue.append(entry)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+
+    def _start_tag(self, key):
+        return max(self._virtual_time, self._finish_times.get(key, 0.0))
+
+    async def _dispatch(self):
+        """Launch queued calls, always picking the ready key with the smallest virtual start time."""
+        # Drained queues are deleted below, so every key left in _queues has work waiting.
+        # Only keys with a token in their bucket are dispatched, so a slot is never held
+        # by a call that is just waiting for its rate limit.
+        while True:
+            if not self._queues:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            await self._slots.acquire()
+            now = time.monotonic()
+            ready = [key for key in self._queues if self._available(key, now) >= 1]
+            if not ready:
+                self._slots.release()
+                # Sleep until the soonest bucket refills, or new work arrives
+                delay = min(
+                    (1 - self._available(key, now)) / self.rates.get(key, self.initial_rate)
+                    for key in self._queues
+                )
+                self._wakeup.clear()
+                try:
+                    async with asyncio.timeout(delay):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+                continue
+
+            key = min(ready, key=self._start_tag)
+            job, future, attempt = self._queues[key].popleft()
+            if not self._queues[key]:
+                del self._queues[key]
+
+            if future.cancelled():
+                self._slots.release()
+                if asyncio.iscoroutine(job):
+                    job.close()
+                continue
+
+            self._take_token(key, now)
+            start = self._start_tag(key)
+            self._virtual_time = start
+            self._finish_times[key] = start + 1.0 / self.weights.get(key, 1)
+
+            task = asyncio.create_task(self._run(key, job, future, attempt))
+            future.add_done_callback(lambda f, t=task: t.cancel() if f.cancelled() else None)
+
+    async def _run(self, key, job, future, attempt):
+        """Make one attempt at a call, holding its concurrency slot only while it's in flight."""
+        retry_delay = None
+        try:
+            # If it's a factory function, call it to get the coroutine
+            if callable(job) and not asyncio.iscoroutine(job):
+                coroutine = job()
+            else:
+                coroutine = job
+
+            result = await coroutine
+
+            self._on_success(key)
+            if not future.done():
+                future.set_result(result)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+        except (discord.HTTPException, aiohttp.ClientResponseError) as e:
+            retry_delay = self._retry_delay(key, e, attempt + 1)
+            if retry_delay is None and not future.done():
+                future.set_exception(e)
+        except Exception as e:
+            self.logger.error(f"Unexpected error: {e}")
+            self.logger.debug("Full traceback", exc_info=True)
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._slots.release()
+
+        if retry_delay is not None:
+            # Back off without a slot, then rejoin the front of the key's queue
+            await asyncio.sleep(retry_delay)
+            if not future.done():
+                self._enqueue(key, (job, future, attempt + 1), front=True)
+
+    def _retry_delay(self, key, error, attempt):
+        """
+        Adjusts key's rate for a failed attempt and returns how long to wait before retrying.
+
+        Returns None when the error should be raised to the caller instead.
+        """
         max_retries = 5
-        attempt = 0
-        
-        while attempt < max_retries:
+
+        if isinstance(error, aiohttp.ClientResponseError):
+            # Overloaded non-Discord endpoints (e.g. webhooks) feed the same AIMD backoff
+            if error.status != 429 and error.status < 500:
+                return None
+            self._on_throttle(key)
+
+            if attempt >= max_retries:
+                self.logger.error(f"Failed after {max_retries} attempts: {error}")
+                return None
+
             try:
-                # Add jitter to prevent thundering herd
-                if key in self.backoff_times:
-                    jitter = random.uniform(-self.jitter, self.jitter)
-                    await asyncio.sleep(self.backoff_times[key] * (1 + jitter))
-                
-                # If it's a factory function, call it to get the coroutine
-                if callable(coroutine_or_factory) and not asyncio.iscoroutine(coroutine_or_factory):
-                    coroutine = coroutine_or_factory()
-                else:
-                    coroutine = coroutine_or_factory
-                
-                result = await coroutine
-                
-                # Reset backoff on success
-                self.backoff_times[key] = self.base_delay
-                return result
-                
-            except discord.HTTPException as e:
-                attempt += 1
-                
-                if e.status == 429:  # Rate limit hit
-                    retry_after = e.retry_after if hasattr(e, 'retry_after') else None
-                    
-                    if retry_after:
-                        self.logger.warning(f"Rate limit hit for {key}. Retry after {retry_after}s")
-                        await asyncio.sleep(retry_after)
-                    else:
-                        # Calculate exponential backoff
-                        current_delay = self.backoff_times.get(key, self.base_delay)
-                        next_delay = min(current_delay * 2, self.max_delay)
-                        self.backoff_times[key] = next_delay
-                        
-                        self.logger.warning(f"Rate limit hit for {key}. Using exponential backoff: {next_delay}s")
-                        await asyncio.sleep(next_delay)
-                        
-                elif attempt == max_retries:
-                    self.logger.error(f"Failed after {max_retries} attempts: {e}")
-                    raise
-                else:
-                    self.logger.warning(f"Discord API error (attempt {attempt}/{max_retries}): {e}")
-                    # Calculate exponential backoff for other errors
-                    current_delay = self.backoff_times.get(key, self.base_delay)
-                    next_delay = min(current_delay * 2, self.max_delay)
-                    self.backoff_times[key] = next_delay
-                    await asyncio.sleep(next_delay)
-            
-            except Exception as e:
-                self.logger.error(f"Unexpected error: {e}")
-                self.logger.debug(traceback.format_exc())
-                raise 
\ No newline at end of file
+                delay = float((error.headers or {}).get('Retry-After'))
+            except (TypeError, ValueError):
+                delay = (1 / self.rates[key]) * (1 + random.uniform(-self.jitter, self.jitter))
+            self.logger.warning(
+                f"HTTP {error.status} for {key} (attempt {attempt}/{max_retries}). "
+                f"Rate now {self.rates[key]:.2f}/s, retrying in {delay:.1f}s"
+            )
+            return delay
+
+        if error.status == 429 or error.status >= 500 or self._nearly_exhausted(error):
+            self._on_throttle(key)
+
+        if attempt >= max_retries:
+            self.logger.error(f"Failed after {max_retries} attempts: {error}")
+            return None
+
+        retry_after = getattr(error, 'retry_after', None)
+        if error.status == 429 and retry_after:
+            self.logger.warning(f"Rate limit hit for {key}. Retry after {retry_after}s")
+            return retry_after
+
+        # Cool down for one token interval at the reduced rate, with jitter
+        delay = (1 / self.rates.get(key, self.initial_rate)) * (1 + random.uniform(-self.jitter, self.jitter))
+        self.logger.warning(
+            f"Discord API error for {key} (attempt {attempt}/{max_retries}): {error}. "
+            f"Rate now {self.rates.get(key, self.initial_rate):.2f}/s, retrying in {delay:.1f}s"
+        )
+        return delay
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 
 @dataclass
 class Column:
@@ -9,6 +9,18 @@ class Column:
     nullable: bool = False
     default: Optional[str] = None
 
+@dataclass(slots=True)
+class MessageRecord:
+    """A stored message, trimmed to the fields the summariser sends to Claude."""
+    message_id: int
+    channel_id: int
+    author_id: int
+    author_name: str
+    content: str
+    created_at: str
+    reaction_count: int = 0
+    attachments: List[Dict[str, Any]] = field(default_factory=list)
+
 def get_messages_schema() -> List[Column]:
     """Define the schema structure for the messages table."""
     return [
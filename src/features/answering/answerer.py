@@ -48,7 +48,7 @@ class SearchAnswerBot(BaseDiscordBot):
         if missing_vars:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
             
-        self.claude = anthropic.Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+        self.claude = anthropic.AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
         self.answer_channel_id = 1322583491019407361
         self.guild_id = int(os.getenv('GUILD_ID'))
         self.channel_map = {}
@@ -143,20 +143,14 @@ Return ONLY the list of relevant channel IDs, nothing else."""
         input_tokens = len(prompt.split())
         
         try:
-            # Run the blocking Claude API call in a thread pool
-            loop = asyncio.get_running_loop()
-            
-            def call_claude():
-                return self.claude.messages.create(
-                    model="claude-3-5-haiku-latest",
-                    max_tokens=500,
-                    messages=[{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                )
-            
-            response = await loop.run_in_executor(None, call_claude)
+            response = await self.claude.messages.create(
+                model="claude-3-5-haiku-latest",
+                max_tokens=500,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }]
+            )
             
             output_tokens = len(response.content[0].text.split())
             input_cost = (input_tokens / 1000000) * 0.80
@@ -216,20 +210,14 @@ Return ONLY the list of relevant channel IDs, nothing else."""
         input_tokens = len(system_prompt.split()) + len(question.split())
         
         try:
-            # Run the blocking Claude API call in a thread pool
-            loop = asyncio.get_running_loop()
-            
-            def call_claude():
-                return self.claude.messages.create(
-                    model="claude-3-5-haiku-latest",
-                    max_tokens=500,
-                    messages=[{
-                        "role": "user",
-                        "content": system_prompt + question
-                    }]
-                )
-            
-            response = await loop.run_in_executor(None, call_claude)
+            response = await self.claude.messages.create(
+                model="claude-3-5-haiku-latest",
+                max_tokens=500,
+                messages=[{
+                    "role": "user",
+                    "content": system_prompt + question
+                }]
+            )
             
             output_tokens = len(response.content[0].text.split())
             input_cost = (input_tokens / 1000000) * 0.80
@@ -380,20 +368,14 @@ Answer:"""
             # Calculate input tokens
             input_tokens = len(prompt.split())  # Simple approximation
             
-            # Run the blocking Claude API call in a thread pool
-            loop = asyncio.get_running_loop()
-            
-            def call_claude():
-                return self.claude.messages.create(
-                    model="claude-3-5-haiku-latest",
-                    max_tokens=1500,
-                    messages=[{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                )
-            
-            response = await loop.run_in_executor(None, call_claude)
+            response = await self.claude.messages.create(
+                model="claude-3-5-haiku-latest",
+                max_tokens=1500,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }]
+            )
             
             # Calculate output tokens and costs
             output_tokens = len(response.content[0].text.split())  # Simple approximation
@@ -338,22 +338,9 @@ class ArtCurator(BaseDiscordBot):
 
                     # If message has valid content
                     if (has_valid_attachment or has_valid_link):
-                        # Check if we already have either reaction
-                        has_love_letter = False
-                        has_inbox_tray = False
-                        for reaction in message.reactions:
-                            if str(reaction.emoji) == '💌':
-                                async for user in reaction.users():
-                                    if user.id == self.user.id:
-                                        has_love_letter = True
-                                        break
-                            elif str(reaction.emoji) == '📥':
-                                async for user in reaction.users():
-                                    if user.id == self.user.id:
-                                        has_inbox_tray = True
-                                        break
-                            if has_love_letter or has_inbox_tray:
-                                break
+                        # Check if we already have either reaction (reaction.me avoids fetching the reactor list)
+                        has_love_letter = any(r.me and str(r.emoji) == '💌' for r in message.reactions)
+                        has_inbox_tray = any(r.me and str(r.emoji) == '📥' for r in message.reactions)
 
                         # If neither reaction exists, proceed with adding inbox tray
                         if not has_love_letter and not has_inbox_tray:
@@ -376,13 +363,9 @@ class ArtCurator(BaseDiscordBot):
                                                 # Refetch message to ensure it's still valid
                                                 message = await channel.fetch_message(message_id)
                                                 # Check again for either reaction in case one was added during the delay
-                                                has_either_reaction = False
-                                                for reaction in message.reactions:
-                                                    if str(reaction.emoji) in ['💌', '📥']:
-                                                        users = [user async for user in reaction.users()]
-                                                        if any(user.id == self.user.id for user in users):
-                                                            has_either_reaction = True
-                                                            break
+                                                has_either_reaction = any(
+                                                    r.me and str(r.emoji) in ['💌', '📥'] for r in message.reactions
+                                                )
                                                 if not has_either_reaction:
                                                     await message.add_reaction('📥')
                                                     self.logger.info(f"Added delayed inbox tray reaction to message from {message.author}.")
@@ -410,13 +393,9 @@ class ArtCurator(BaseDiscordBot):
                                         try:
                                             message = await channel.fetch_message(message_id)
                                             # Check again for either reaction in case one was added during the delay
-                                            has_either_reaction = False
-                                            for reaction in message.reactions:
-                                                if str(reaction.emoji) in ['💌', '📥']:
-                                                    users = [user async for user in reaction.users()]
-                                                    if any(user.id == self.user.id for user in users):
-                                                        has_either_reaction = True
-                                                        break
+                                            has_either_reaction = any(
+                                                r.me and str(r.emoji) in ['💌', '📥'] for r in message.reactions
+                                            )
                                             if not has_either_reaction:
                                                 await message.add_reaction('📥')
                                                 self.logger.info(f"Added delayed inbox tray reaction to untracked message from {message.author}.")
@@ -766,10 +745,8 @@ class ArtCurator(BaseDiscordBot):
                 # Thread was already deleted
                 return
             
-            # Get all messages in the thread
-            messages = []
-            async for msg in thread.history(limit=None, oldest_first=True):
-                messages.append(msg)
+            # Only need to know whether there's more than one message, so don't page the whole thread
+            messages = [msg async for msg in thread.history(limit=2, oldest_first=True)]
             
             # If there are only 1 message (the tagging reminder), consider it inactive
             if len(messages) <= 1:
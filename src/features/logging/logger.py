@@ -1,3 +1,4 @@
+import asyncio
 import discord
 import logging
 import os
@@ -51,6 +52,8 @@ class MessageLogger(BaseDiscordBot):
         
         # Load bot user ID
         self.bot_user_id = int(os.getenv('BOT_USER_ID'))
+        # Bounds concurrent reaction-user fetches so one message can't flood the reactions route
+        self._reaction_semaphore = asyncio.Semaphore(5)
         
         # Load monitored channels based on dev mode
         if dev_mode:
@@ -81,31 +84,38 @@ class MessageLogger(BaseDiscordBot):
         """Setup hook to initialize any necessary resources."""
         logger.info("Message logger initialized and ready")
         
+    async def _collect_reactor_ids(self, reaction: discord.Reaction) -> set:
+        """Return the ids of every user who added this reaction."""
+        async with self._reaction_semaphore:
+            return {user.id async for user in reaction.users(limit=None)}
+
     async def _prepare_message_data(self, message: discord.Message) -> Dict[str, Any]:
         """Convert a discord message into a format suitable for database storage."""
         try:
             # Calculate total reaction count
             reaction_count = sum(reaction.count for reaction in message.reactions) if message.reactions else 0
             
-            # Get list of unique reactors
+            # Get list of unique reactors, fetching each reaction's users concurrently.
+            # Reactions left only by the bot can't add anyone, so they're skipped without a fetch.
             reactors = []
-            if message.reactions:
-                for reaction in message.reactions:
-                    async for user in reaction.users():
-                        if user.id not in reactors and user.id != self.bot_user_id:
-                            reactors.append(user.id)
+            candidates = [r for r in message.reactions if not (r.me and r.count == 1)] if message.reactions else []
+            if candidates:
+                per_reaction = await asyncio.gather(*(self._collect_reactor_ids(r) for r in candidates))
+                unique_reactors = set().union(*per_reaction)
+                unique_reactors.discard(self.bot_user_id)
+                reactors = sorted(unique_reactors)
             
             # More defensive thread_id handling with logging
             thread_id = None
             try:
                 if hasattr(message, 'thread') and message.thread:
                     thread_id = message.thread.id
-                    logger.debug(f"Found thread_id {thread_id} for message {message.id}")
+                    logger.debug("Found thread_id %s for message %s", thread_id, message.id)
                 elif message.channel and isinstance(message.channel, discord.Thread):
                     thread_id = message.channel.id
-                    logger.debug(f"Message {message.id} is in thread {thread_id}")
+                    logger.debug("Message %s is in thread %s", message.id, thread_id)
             except Exception as e:
-                logger.debug(f"Error getting thread_id for message {message.id}: {e}")
+                logger.debug("Error getting thread_id for message %s: %s", message.id, e)
             
             # Get guild display name (nickname) if available
             display_name = None  # Only set if there's a server nickname
@@ -116,7 +126,7 @@ class MessageLogger(BaseDiscordBot):
                     if member:
                         display_name = member.nick  # Only use the server nickname
             except Exception as e:
-                logger.debug(f"Error getting display name for user {message.author.id}: {e}")
+                logger.debug("Error getting display name for user %s: %s", message.author.id, e)
             
             # Get category ID if available
             category_id = None
@@ -179,7 +189,7 @@ class MessageLogger(BaseDiscordBot):
             message_data = await self._prepare_message_data(message)
             self.db.store_messages([message_data])
             
-            logger.debug(f"Logged message {message.id} from {message.author.name} in #{message.channel.name}")
+            logger.debug("Logged message %s from %s in #%s", message.id, message.author.name, message.channel.name)
             
         except Exception as e:
             logger.error(f"Error logging message: {e}")
@@ -199,7 +209,7 @@ class MessageLogger(BaseDiscordBot):
             message_data = await self._prepare_message_data(after)
             self.db.store_messages([message_data])
             
-            logger.debug(f"Logged edited message {after.id} from {after.author.name} in #{after.channel.name}")
+            logger.debug("Logged edited message %s from %s in #%s", after.id, after.author.name, after.channel.name)
             
         except Exception as e:
             logger.error(f"Error logging edited message: {e}")
@@ -223,7 +233,7 @@ class MessageLogger(BaseDiscordBot):
                     SET is_deleted = TRUE 
                     WHERE message_id = ?
                 """, (message.id,))
-                logger.debug(f"Message {message.id} marked as deleted")
+                logger.debug("Message %s marked as deleted", message.id)
             
         except Exception as e:
             logger.error(f"Error handling message deletion: {e}")
@@ -232,21 +242,21 @@ class MessageLogger(BaseDiscordBot):
     async def on_reaction_add(self, reaction: discord.Reaction, user: discord.User):
         """Called when a reaction is added to a message."""
         try:
-            logger.info(f"Reaction add detected - Emoji: {reaction.emoji}, User: {user.name} ({user.id}), Message: {reaction.message.id}")
+            logger.info("Reaction add detected - Emoji: %s, User: %s (%s), Message: %s", reaction.emoji, user.name, user.id, reaction.message.id)
             
             # Ignore reactions from the bot itself
             if user == self.user or user.id == self.bot_user_id:
-                logger.debug(f"Ignoring reaction from bot user: {user.id}")
+                logger.debug("Ignoring reaction from bot user: %s", user.id)
                 return
 
             # Skip configured channels
             if reaction.message.channel.id in self.skip_channels:
-                logger.debug(f"Skipping reaction in excluded channel: {reaction.message.channel.id}")
+                logger.debug("Skipping reaction in excluded channel: %s", reaction.message.channel.id)
                 return
 
             # Get current message data from database
             try:
-                logger.debug(f"Querying database for message {reaction.message.id}")
+                logger.debug("Querying database for message %s", reaction.message.id)
                 results = self.db.execute_query("""
                     SELECT reaction_count, reactors
                     FROM messages
@@ -267,27 +277,27 @@ class MessageLogger(BaseDiscordBot):
                         logger.error(f"Error fetching message from Discord: {fetch_err}")
                     return
 
-                logger.debug(f"Database query results: {results[0]}")
+                logger.debug("Database query results: %s", results[0])
                 current_count = results[0].get('reaction_count', 0) or 0
                 current_reactors_json = results[0].get('reactors')
                 current_reactors = json.loads(current_reactors_json) if current_reactors_json else []
                 
-                logger.debug(f"Current reaction state - Count: {current_count}, Reactors: {current_reactors}")
+                logger.debug("Current reaction state - Count: %s, Reactors: %s", current_count, current_reactors)
 
                 # Add new reactor if not already in list
                 if user.id not in current_reactors:
                     current_reactors.append(user.id)
-                    logger.debug(f"Added new reactor {user.id} to reactors list")
+                    logger.debug("Added new reactor %s to reactors list", user.id)
 
                 # Update database with new count and reactors
                 try:
-                    logger.debug(f"Updating database - New count: {current_count + 1}, New reactors: {current_reactors}")
+                    logger.debug("Updating database - New count: %s, New reactors: %s", current_count + 1, current_reactors)
                     self.db.execute_query("""
                         UPDATE messages
                         SET reaction_count = ?, reactors = ?
                         WHERE message_id = ?
                     """, (current_count + 1, json.dumps(current_reactors), reaction.message.id))
-                    logger.info(f"Successfully updated reaction in database for message {reaction.message.id}")
+                    logger.info("Successfully updated reaction in database for message %s", reaction.message.id)
                 except Exception as db_error:
                     logger.error(f"Database error updating reaction: {db_error}")
                     logger.error(f"Message ID: {reaction.message.id}")
@@ -336,15 +346,15 @@ class MessageLogger(BaseDiscordBot):
     async def on_reaction_remove(self, reaction: discord.Reaction, user: discord.User):
         """Called when a reaction is removed from a message."""
         try:
-            logger.info(f"Reaction remove detected - Emoji: {reaction.emoji}, User: {user.name} ({user.id}), Message: {reaction.message.id}")
+            logger.info("Reaction remove detected - Emoji: %s, User: %s (%s), Message: %s", reaction.emoji, user.name, user.id, reaction.message.id)
             
             # Ignore reactions from the bot itself
             if user == self.user or user.id == self.bot_user_id:
-                logger.debug(f"Ignoring reaction removal from bot user: {user.id}")
+                logger.debug("Ignoring reaction removal from bot user: %s", user.id)
                 return
 
             # Get current message data from database
-            logger.debug(f"Querying database for message {reaction.message.id}")
+            logger.debug("Querying database for message %s", reaction.message.id)
             results = self.db.execute_query("""
                 SELECT reaction_count, reactors
                 FROM messages
@@ -355,27 +365,27 @@ class MessageLogger(BaseDiscordBot):
                 logger.warning(f"Message {reaction.message.id} not found in database for reaction removal")
                 return
 
-            logger.debug(f"Database query results: {results[0]}")
+            logger.debug("Database query results: %s", results[0])
             current_count = results[0].get('reaction_count', 0) or 0
             current_reactors_json = results[0].get('reactors')
             current_reactors = json.loads(current_reactors_json) if current_reactors_json else []
             
-            logger.debug(f"Current reaction state - Count: {current_count}, Reactors: {current_reactors}")
+            logger.debug("Current reaction state - Count: %s, Reactors: %s", current_count, current_reactors)
 
             # Remove reactor from list if present
             if user.id in current_reactors:
                 current_reactors.remove(user.id)
-                logger.debug(f"Removed reactor {user.id} from reactors list")
+                logger.debug("Removed reactor %s from reactors list", user.id)
 
             # Update database with new count and reactors
             try:
-                logger.debug(f"Updating database - New count: {max(0, current_count - 1)}, New reactors: {current_reactors}")
+                logger.debug("Updating database - New count: %s, New reactors: %s", max(0, current_count - 1), current_reactors)
                 self.db.execute_query("""
                     UPDATE messages
                     SET reaction_count = ?, reactors = ?
                     WHERE message_id = ?
                 """, (max(0, current_count - 1), json.dumps(current_reactors), reaction.message.id))
-                logger.info(f"Successfully updated reaction removal in database for message {reaction.message.id}")
+                logger.info("Successfully updated reaction removal in database for message %s", reaction.message.id)
             except Exception as e:
                 logger.error(f"Error updating database for reaction removal: {e}")
                 logger.error(traceback.format_exc())
@@ -3,13 +3,17 @@
 import discord
 import logging
 import os
+import time
 import aiohttp
+import aiofiles
 import asyncio # Added
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional
 
 from src.common.db_handler import DatabaseHandler
 from src.common.claude_client import ClaudeClient
+from src.common.rate_limiter import RateLimiter
 from .subfeatures.notify_user import send_sharing_request_dm
 # Removed content_analyzer import, assuming title generation covers description needs
 # from .subfeatures.content_analyzer import generate_description_with_claude
@@ -20,12 +24,40 @@ from .subfeatures.social_poster import (
     post_to_tiktok_via_zapier,
     post_to_youtube_via_zapier,
     generate_social_media_title,
+    DEFAULT_VIDEO_TITLE,
     _build_zapier_payload # Also import the payload builder
 )
 
 logger = logging.getLogger('DiscordBot')
 
+_VIDEO_EXTENSIONS = frozenset({'.mp4', '.mov', '.webm', '.avi', '.mkv'})
+
+# Posting budgets as (calls, period in seconds). The Zapier-backed platforms use Instagram's budget.
+_PLATFORM_LIMITS = {
+    "twitter": (50, 900),
+    "instagram": (25, 3600),
+    "tiktok": (25, 3600),
+    "youtube": (25, 3600),
+}
+
+def _platform_rate_limiter() -> RateLimiter:
+    """Builds a RateLimiter with a fixed token bucket per platform."""
+    limiter = RateLimiter()
+    for platform, (calls, period) in _PLATFORM_LIMITS.items():
+        limiter.set_limit(platform, rate=calls / period, burst=calls)
+    return limiter
+
+def _comment_as_title(content: Optional[str]) -> Optional[str]:
+    """Returns the post's comment if it already reads like a one-line title."""
+    clean = (content or '').strip()
+    if 10 <= len(clean) <= 80 and '\n' not in clean and 'http' not in clean and '<' not in clean:
+        return clean
+    return None
+
 class Sharer:
+    # Per-platform token buckets, shared by every Sharer so all shares draw on the same budget
+    rate_limiter = _platform_rate_limiter()
+
     def __init__(self, bot: discord.Client, db_handler: DatabaseHandler, logger_instance: logging.Logger, claude_client: ClaudeClient):
         self.bot = bot
         self.db_handler = db_handler
@@ -33,28 +65,50 @@ class Sharer:
         self.claude_client = claude_client # Keep Claude client if needed elsewhere or for description
         self.temp_dir = Path("./temp_media_sharing")
         self.temp_dir.mkdir(exist_ok=True)
+        self._prune_stale_files()
+        self._http: Optional[aiohttp.ClientSession] = None
+        # Dedicated pool for the blocking parts of sharing (tweepy, OpenCV, file removal)
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sharer")
+
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Return the shared download session, (re)creating it if needed."""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+            )
+        return self._http
+
+    async def aclose(self):
+        """Close the shared download session and thread pool."""
+        if self._http and not self._http.closed:
+            await self._http.close()
+        self._http = None
+        self._executor.shutdown(wait=False)
 
     async def _download_attachment(self, attachment: discord.Attachment) -> Optional[Dict]:
         """Downloads a single attachment to the temporary directory."""
         save_path = self.temp_dir / f"{attachment.id}_{attachment.filename}"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(attachment.url) as resp:
-                    if resp.status == 200:
-                        with open(save_path, 'wb') as f:
-                            f.write(await resp.read())
-                        self.logger.info(f"Successfully downloaded attachment: {save_path}")
-                        return {
-                            'url': attachment.url,
-                            'filename': attachment.filename,
-                            'content_type': attachment.content_type,
-                            'size': attachment.size,
-                            'id': attachment.id,
-                            'local_path': str(save_path) # Store local path
-                        }
-                    else:
-                        self.logger.error(f"Failed to download attachment {attachment.url}. Status: {resp.status}")
-                        return None
+            session = await self._get_http_session()
+            async with session.get(attachment.url) as resp:
+                if resp.status == 200:
+                    # Stream to disk rather than holding the whole file in memory,
+                    # without blocking the event loop on the file writes
+                    async with aiofiles.open(save_path, 'wb') as f:
+                        async for chunk in resp.content.iter_chunked(64 * 1024):
+                            await f.write(chunk)
+                    self.logger.info(f"Successfully downloaded attachment: {save_path}")
+                    return {
+                        'url': attachment.url,
+                        'filename': attachment.filename,
+                        'content_type': attachment.content_type,
+                        'size': attachment.size,
+                        'id': attachment.id,
+                        'local_path': str(save_path) # Store local path
+                    }
+                else:
+                    self.logger.error(f"Failed to download attachment {attachment.url}. Status: {resp.status}")
+                    return None
         except Exception as e:
             self.logger.error(f"Error downloading attachment {attachment.url}: {e}", exc_info=True)
             return None
@@ -102,12 +156,15 @@ class Sharer:
              self.logger.error(f"Cannot finalize sharing: Failed to fetch message {message_id} from channel {channel_id}.")
              return
 
-        # 3. Download Attachments
+        # 3. Download Attachments (concurrently, over the shared session)
         downloaded_attachments = []
         if message_object.attachments:
-            for attachment in message_object.attachments:
-                downloaded = await self._download_attachment(attachment)
-                if downloaded:
+            results = await asyncio.gather(
+                *(self._download_attachment(a) for a in message_object.attachments),
+                return_exceptions=True
+            )
+            for downloaded in results:
+                if downloaded and not isinstance(downloaded, BaseException):
                     # Add jump URL to attachment dict for Zapier payload builder
                     downloaded['post_jump_url'] = message_object.jump_url
                     downloaded_attachments.append(downloaded)
@@ -119,8 +176,9 @@ class Sharer:
         # Assume first attachment is primary for now
         primary_attachment = downloaded_attachments[0]
         media_local_path = primary_attachment.get('local_path')
-        is_video = primary_attachment.get('content_type', '').startswith('video') or Path(media_local_path).suffix.lower() in ['.mp4', '.mov', '.webm', '.avi', '.mkv']
-        is_gif = Path(media_local_path).suffix.lower() == '.gif'
+        suffix = os.path.splitext(media_local_path)[1].lower()
+        is_video = primary_attachment.get('content_type', '').startswith('video') or suffix in _VIDEO_EXTENSIONS
+        is_gif = suffix == '.gif'
         
         # 4. Generate Title (primarily for videos, but can use for others too)
         # Use placeholder description for now, replace if Claude description needed
@@ -129,12 +187,27 @@ class Sharer:
         
         generated_title = "Featured Creation" # Default title
         if is_video and media_local_path:
-            self.logger.info(f"Generating social media title for video message {message_id}.")
-            generated_title = await generate_social_media_title(
-                video_path=media_local_path,
-                original_comment=message_object.content,
-                post_id=message_id
-            )
+            # The artist's own short comment makes a fine title; otherwise a retried share
+            # reuses the stored title instead of another frame extraction + Claude call
+            comment_title = _comment_as_title(message_object.content)
+            cached_caption = None if comment_title else self.db_handler.get_cached_caption(message_id)
+            if comment_title:
+                generated_title = comment_title
+                self.logger.info(f"Using the post comment as the title for video message {message_id}.")
+            elif cached_caption:
+                generated_title = cached_caption['title']
+                self.logger.info(f"Using cached social media title for video message {message_id}.")
+            else:
+                self.logger.info(f"Generating social media title for video message {message_id}.")
+                generated_title = await generate_social_media_title(
+                    video_path=media_local_path,
+                    original_comment=message_object.content,
+                    post_id=message_id,
+                    executor=self._executor
+                )
+                # Don't cache the fallback, so a later retry can still get a real title
+                if generated_title != DEFAULT_VIDEO_TITLE:
+                    self.db_handler.set_cached_caption(message_id, generated_title, generated_desc)
         else:
              # Maybe use Claude to generate a description/title for images/gifs?
              # For now, use a simpler approach or default title/desc
@@ -148,46 +221,54 @@ class Sharer:
         # 5. Post to Social Media Platforms
         # Post to Twitter first
         self.logger.info(f"Attempting to post message {message_id} to Twitter.")
-        tweet_url = await post_tweet(
+        tweet_url = await self.rate_limiter.execute("twitter", lambda: post_tweet(
             generated_description=generated_desc, # Use generated description
             user_details=user_details,
             attachments=downloaded_attachments, # Pass list
-            original_content=message_object.content
-        )
+            original_content=message_object.content,
+            executor=self._executor
+        ))
         if tweet_url:
             self.logger.info(f"Successfully posted message {message_id} to Twitter: {tweet_url}")
         else:
             self.logger.error(f"Failed to post message {message_id} to Twitter.")
-            
-        # Add short delay between platform posts
-        await asyncio.sleep(2)
 
-        # Post to Zapier webhooks (if not a GIF, as per example logic)
+        # Post to Zapier webhooks (if not a GIF, as per example logic).
+        # The webhooks are independent endpoints, so post to them concurrently.
         if not is_gif:
-            # Instagram
             ig_payload = _build_zapier_payload("instagram", user_details, primary_attachment, generated_title, generated_desc, message_object.content)
-            self.logger.info(f"Attempting to post message {message_id} to Instagram via Zapier.")
-            await asyncio.to_thread(post_to_instagram_via_zapier, ig_payload) # Run sync requests in thread
-            await asyncio.sleep(2)
-
-            # TikTok
             tiktok_payload = _build_zapier_payload("tiktok", user_details, primary_attachment, generated_title, generated_desc, message_object.content)
-            self.logger.info(f"Attempting to post message {message_id} to TikTok via Zapier.")
-            await asyncio.to_thread(post_to_tiktok_via_zapier, tiktok_payload)
-            await asyncio.sleep(2)
-
-            # YouTube
             youtube_payload = _build_zapier_payload("youtube", user_details, primary_attachment, generated_title, generated_desc, message_object.content)
-            self.logger.info(f"Attempting to post message {message_id} to YouTube via Zapier.")
-            await asyncio.to_thread(post_to_youtube_via_zapier, youtube_payload)
+            self.logger.info(f"Attempting to post message {message_id} to Instagram, TikTok and YouTube via Zapier.")
+            session = await self._get_http_session()
+            results = await asyncio.gather(
+                self.rate_limiter.execute("instagram", lambda: post_to_instagram_via_zapier(session, ig_payload)),
+                self.rate_limiter.execute("tiktok", lambda: post_to_tiktok_via_zapier(session, tiktok_payload)),
+                self.rate_limiter.execute("youtube", lambda: post_to_youtube_via_zapier(session, youtube_payload)),
+                return_exceptions=True
+            )
+            for platform_name, result in zip(("Instagram", "TikTok", "YouTube"), results):
+                if isinstance(result, Exception):
+                    self.logger.error(f"Giving up on {platform_name} Zapier post for message {message_id}: {result}")
 
         else:
             self.logger.info(f"Skipping Zapier posts for GIF message {message_id}.")
 
         # 6. Cleanup Downloaded Files
-        self._cleanup_files([a['local_path'] for a in downloaded_attachments])
+        await self._cleanup_files([a['local_path'] for a in downloaded_attachments])
+
+    def _prune_stale_files(self, max_age: float = 3600):
+        """Removes downloads left in the temp directory by earlier, interrupted runs."""
+        cutoff = time.time() - max_age
+        with os.scandir(self.temp_dir) as entries:
+            stale = [entry.path for entry in entries if entry.is_file() and entry.stat().st_mtime < cutoff]
+        self._remove_files(stale)
+
+    async def _cleanup_files(self, file_paths: List[str]):
+        """Removes temporary files in one hop off the event loop."""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._remove_files, file_paths)
 
-    def _cleanup_files(self, file_paths: List[str]):
+    def _remove_files(self, file_paths: List[str]):
         """Removes temporary files."""
         for file_path in file_paths:
             try:
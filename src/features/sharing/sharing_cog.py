@@ -25,6 +25,9 @@ class SharingCog(commands.Cog):
         logger.info("SharingCog initialized.")
         # TODO: Add any sharing-specific commands here using @commands.command or @app_commands.command
 
+    async def cog_unload(self):
+        await self.sharer_instance.aclose()
+
     # Example command (can be removed if not needed)
     # @commands.command(name="sharing_status")
     # async def sharing_status(self, ctx):
@@ -1,21 +1,76 @@
 # Placeholder for content_analyzer functions 
 
 import anthropic
+import asyncio
 import os
+import random
 import logging
 import cv2
+import numpy as np
 import base64
-import shutil
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 
 # Import the shared client
 from src.common.claude_client import ClaudeClient 
 
 logger = logging.getLogger('DiscordBot')
 
+# Claude's vision models gain nothing from larger images, only bigger payloads
+MAX_IMAGE_EDGE = 1024
+JPEG_QUALITY = 80
+
+# Video frames go to Claude as one tiled image: one image block costs less than several
+MOSAIC_MAX_EDGE = 1536
+MOSAIC_NOTE = "The image is a grid of video frames in temporal order, left to right and top to bottom."
+
 # --- Helper Functions (Adapted from utils/youtube_title_generator) ---
 
+def _downscale_frame(image):
+    """Shrinks a decoded image so its long edge is at most MAX_IMAGE_EDGE."""
+    scale = min(1.0, MAX_IMAGE_EDGE / max(image.shape[:2]))
+    if scale < 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image
+
+def _frames_to_mosaic(images: List[np.ndarray], columns: int = 3) -> Optional[bytes]:
+    """Tiles decoded frames into a single grid JPEG, or returns None if there's nothing to tile."""
+    if len(images) < 2:
+        return None
+    columns = min(columns, len(images))
+    rows = -(-len(images) // columns)
+    height, width = images[0].shape[:2]
+    scale = min(MOSAIC_MAX_EDGE / (columns * width), MOSAIC_MAX_EDGE / (rows * height))
+    cell_w, cell_h = max(1, int(width * scale)), max(1, int(height * scale))
+    mosaic = np.zeros((rows * cell_h, columns * cell_w, 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        row, col = divmod(i, columns)
+        mosaic[row * cell_h:(row + 1) * cell_h, col * cell_w:(col + 1) * cell_w] = cv2.resize(
+            image, (cell_w, cell_h), interpolation=cv2.INTER_AREA
+        )
+    success, buffer = cv2.imencode('.jpg', mosaic, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return buffer.tobytes() if success else None
+
+def _encode_frames(images: List[np.ndarray]) -> Tuple[List[bytes], bool]:
+    """JPEG-encodes decoded frames once: as a single mosaic if possible, else one by one. Returns (jpegs, is_mosaic)."""
+    mosaic = _frames_to_mosaic(images)
+    if mosaic:
+        return [mosaic], True
+    frames = []
+    for image in images:
+        success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if success:
+            frames.append(buffer.tobytes())
+    return frames, False
+
+def _downscaled_image_to_base64(image_path: str) -> Optional[str]:
+    """Returns an oversized still image as a downscaled base64 JPEG, or None to send it as is."""
+    image = cv2.imread(image_path)
+    if image is None or max(image.shape[:2]) <= MAX_IMAGE_EDGE:
+        return None
+    success, buffer = cv2.imencode('.jpg', _downscale_frame(image), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return base64.b64encode(buffer).decode('utf-8') if success else None
+
 def _image_to_base64(image_path: str) -> Optional[str]:
     """Converts an image file to a base64 encoded string."""
     try:
@@ -41,65 +96,55 @@ def _get_media_type(file_path: str) -> Optional[str]:
         logger.warning(f"Unsupported image type for base64 encoding: {ext}")
         return None
 
-def _extract_frames(video_path: str, num_frames: int, save_dir: str) -> List[str]:
-    """Extracts a specified number of evenly distributed frames from a video."""
-    frame_paths = []
-    if not os.path.exists(video_path):
-        logger.error(f"Video file not found: {video_path}")
-        return frame_paths
-        
-    save_path = Path(save_dir)
-    save_path.mkdir(parents=True, exist_ok=True)
-    vidcap = cv2.VideoCapture(video_path)
-
-    if not vidcap.isOpened():
-        logger.error(f"Could not open video file: {video_path}")
-        return frame_paths
-
-    total_frames = int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT))
-    if total_frames < 1:
-        logger.warning(f"Video has no frames or failed to read count: {video_path}")
-        vidcap.release()
-        return frame_paths
-
-    # Ensure num_frames is not more than total_frames
-    num_frames_to_extract = min(num_frames, total_frames)
-    if num_frames_to_extract < 1:
-        logger.warning(f"Cannot extract less than 1 frame from {video_path}")
-        vidcap.release()
-        return frame_paths
+def _extract_frames(video_path: str, num_frames: int) -> List[np.ndarray]:
+    """Extracts a specified number of evenly distributed, downscaled frames from a video."""
+    frames = []
+    try:
+        vidcap = cv2.VideoCapture(video_path)
+        if not vidcap.isOpened():
+            logger.error(f"Failed to open video file: {video_path}")
+            return frames
+
+        total_frames = int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames < 1:
+            logger.warning(f"Video {video_path} has no frames.")
+            vidcap.release()
+            return frames
         
-    # Calculate interval, avoid division by zero if only one frame requested
-    frames_interval = (total_frames // num_frames_to_extract) if num_frames_to_extract > 1 else 0
-
-    extracted_count = 0
-    for i in range(num_frames_to_extract):
-        frame_index = i * frames_interval
-        # Ensure frame index is within bounds
-        if frame_index >= total_frames:
-            frame_index = total_frames - 1 
+        # Ensure num_frames is not greater than total_frames
+        num_frames = min(num_frames, total_frames)
+        if num_frames < 1:
+            logger.warning(f"Cannot extract less than 1 frame from {video_path}.")
+            vidcap.release()
+            return frames
             
-        vidcap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-        success, image = vidcap.read()
-
-        if success:
-            frame_filename = save_path / f"frame_{extracted_count:03d}.jpg"
-            try:
-                cv2.imwrite(str(frame_filename), image)
-                frame_paths.append(str(frame_filename))
-                extracted_count += 1
-            except Exception as e:
-                logger.error(f"Failed to write frame {extracted_count} for video {video_path}: {e}")
-        else:
-            # If reading fails, maybe try the next frame? For now, just log.
-            logger.warning(f"Failed to read frame at index {frame_index} for video {video_path}")
-            # Break if we can't even read the first frame requested
-            if i == 0 and extracted_count == 0:
-                 break
+        # Calculate interval, ensuring it's at least 1 frame
+        frames_interval = max(1, total_frames // num_frames)
+        
+        # One sequential pass instead of a keyframe seek + re-decode per target frame.
+        # grab() only advances the stream; frames are converted just for the targets.
+        target_frames = {i * frames_interval for i in range(num_frames)}
+        last_target = max(target_frames)
+        frame_id = 0
+        while frame_id <= last_target:
+            if not vidcap.grab():
+                logger.warning(f"Failed to read frame {frame_id} from {video_path}")
+                break
+            if frame_id in target_frames:
+                success, image = vidcap.retrieve()
+                if success:
+                    frames.append(_downscale_frame(image))
+                else:
+                    logger.warning(f"Failed to read frame {frame_id} from {video_path}")
+            frame_id += 1
 
-    vidcap.release()
-    logger.info(f"Extracted {extracted_count} frames from {video_path} into {save_dir}")
-    return frame_paths
+        vidcap.release()
+        logger.info(f"Extracted {len(frames)} frames from {video_path}")
+        return frames
+    except Exception as e:
+        logger.error(f"Error extracting frames from {video_path}: {e}", exc_info=True)
+        if vidcap.isOpened(): vidcap.release() # Ensure release on error
+        return []
 
 # --- Claude Interaction ---
 
@@ -120,11 +165,15 @@ async def generate_description_with_claude(
     prompt += "\n\nOutput ONLY the generated caption text."
 
     content_blocks = []
-    temp_frame_dir = None
+    has_mosaic = False
 
     try:
         # Prepare media blocks
-        for attachment in attachments[:5]: # Limit attachments to avoid exceeding token limits
+        # Limit attachments to avoid exceeding token limits, sampling across the whole album
+        # (in posting order) rather than always taking the first few
+        if len(attachments) > 5:
+            attachments = [attachments[i] for i in sorted(random.sample(range(len(attachments)), 5))]
+        for attachment in attachments:
             media_path = attachment.get('local_path') # Assume local_path is added earlier
             if not media_path or not os.path.exists(media_path):
                  logger.warning(f"Attachment missing local path or file not found: {attachment.get('filename')}")
@@ -132,28 +181,28 @@ async def generate_description_with_claude(
 
             media_type = attachment.get('content_type', '').lower()
 
-            # If video, extract frames
+            # If video, extract frames in memory and encode them once, as a mosaic where possible
             if media_type.startswith('video/'):
-                if not temp_frame_dir:
-                     # Create a temporary directory for frames for this specific request
-                     temp_frame_dir = Path(f"./temp_frames_{os.urandom(4).hex()}")
-                     temp_frame_dir.mkdir(exist_ok=True)
-                     logger.debug(f"Created temp frame dir: {temp_frame_dir}")
-
-                frame_paths = _extract_frames(video_path=media_path, num_frames=5, save_dir=str(temp_frame_dir))
-                
-                for frame_path in frame_paths[:5]: # Max 5 frames per video
-                     mime_type = _get_media_type(frame_path)
-                     base64_data = _image_to_base64(frame_path)
-                     if mime_type and base64_data:
-                         content_blocks.append({
-                             "type": "image",
-                             "source": {"type": "base64", "media_type": mime_type, "data": base64_data}
-                         })
+                # Decoding is blocking, so keep it off the event loop
+                frames = await asyncio.to_thread(_extract_frames, media_path, 5)
+                if len(frames) < 5:
+                    logger.warning(f"Only extracted {len(frames)} of 5 frames from {attachment.get('filename')}")
+                frames = frames[:5] # Max 5 frames per video
+                frames, is_mosaic = await asyncio.to_thread(_encode_frames, frames)
+                has_mosaic = has_mosaic or is_mosaic
+                for frame in frames:
+                     content_blocks.append({
+                         "type": "image",
+                         "source": {"type": "base64", "media_type": "image/jpeg", "data": base64.b64encode(frame).decode('utf-8')}
+                     })
             # If image, encode directly
             elif media_type.startswith('image/'):
                  mime_type = _get_media_type(media_path) or media_type # Fallback to original content_type
-                 base64_data = _image_to_base64(media_path)
+                 base64_data = await asyncio.to_thread(_downscaled_image_to_base64, media_path)
+                 if base64_data:
+                     mime_type = 'image/jpeg'
+                 else:
+                     base64_data = await asyncio.to_thread(_image_to_base64, media_path)
                  if mime_type and base64_data:
                      content_blocks.append({
                          "type": "image",
@@ -163,6 +212,8 @@ async def generate_description_with_claude(
                  logger.warning(f"Skipping unsupported attachment type: {media_type} for file {attachment.get('filename')}")
         
         # Add the text prompt after all media blocks
+        if has_mosaic:
+            prompt = f"{MOSAIC_NOTE}\n\n{prompt}"
         content_blocks.append({"type": "text", "text": prompt}) # Add prompt text last
 
         if len(content_blocks) == 1: # Only text block was added (no valid media)
@@ -188,11 +239,3 @@ async def generate_description_with_claude(
     except Exception as e:
         logger.error(f"Error preparing content or calling shared Claude client: {e}", exc_info=True)
         return None
-    finally:
-         # Clean up temporary frame directory if it was created
-         if temp_frame_dir and temp_frame_dir.exists():
-             try:
-                 shutil.rmtree(temp_frame_dir)
-                 logger.debug(f"Removed temp frame dir: {temp_frame_dir}")
-             except Exception as e:
-                 logger.error(f"Failed to remove temp frame directory {temp_frame_dir}: {e}") 
\ No newline at end of file
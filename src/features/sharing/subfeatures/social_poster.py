@@ -4,15 +4,15 @@ import tweepy
 import os
 import asyncio
 import logging
-import json
-import requests
+import aiohttp
 import anthropic
-import cv2
-import shutil
 import base64
-from typing import Dict, Optional, List
+from concurrent.futures import Executor
+from typing import Dict, Optional, List, Tuple
 from pathlib import Path
 
+from .content_analyzer import _extract_frames, _encode_frames, MOSAIC_MAX_EDGE, MOSAIC_NOTE
+
 logger = logging.getLogger('DiscordBot')
 
 # --- Environment Variable Check ---
@@ -176,92 +176,84 @@ def _build_zapier_payload(platform: str, user_details: Dict, attachment: Dict, g
 
 # --- Added Title Generation Helpers ---
 
-def _image_to_base64(image_path: str) -> Optional[str]:
-    """Converts an image file to a base64 encoded string."""
+async def _run_media_tool(*args: str) -> Optional[bytes]:
+    """Runs ffmpeg/ffprobe and returns its stdout, or None if it's missing or fails."""
     try:
-        with open(image_path, 'rb') as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-    except Exception as e:
-        logger.error(f"Error encoding image {image_path} to base64: {e}", exc_info=True)
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        logger.debug(f"{args[0]} not found on PATH")
         return None
-
-def _extract_frames(video_path: str, num_frames: int, save_dir: Path) -> bool:
-    """Extracts a specified number of evenly distributed frames from a video."""
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        logger.debug(f"{args[0]} exited with {proc.returncode}: {stderr.decode(errors='replace')[-500:]}")
+        return None
+    return stdout
+
+async def _extract_mosaic_with_ffmpeg(video_path: str, num_frames: int) -> Optional[Tuple[List[bytes], bool]]:
+    """Extracts evenly distributed frames and tiles them into one JPEG in a single ffmpeg pass; None if ffmpeg can't."""
+    # Counting packets only demuxes the file, it doesn't decode it
+    out = await _run_media_tool(
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-count_packets',
+        '-show_entries', 'stream=nb_read_packets', '-of', 'csv=p=0', video_path
+    )
     try:
-        save_dir.mkdir(parents=True, exist_ok=True)
-        vidcap = cv2.VideoCapture(video_path)
-        if not vidcap.isOpened():
-            logger.error(f"Failed to open video file: {video_path}")
-            return False
-
-        total_frames = int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT))
-        if total_frames < 1:
-            logger.warning(f"Video {video_path} has no frames.")
-            vidcap.release()
-            return False
-        
-        # Ensure num_frames is not greater than total_frames
-        num_frames = min(num_frames, total_frames)
-        if num_frames < 1:
-            logger.warning(f"Cannot extract less than 1 frame from {video_path}.")
-            vidcap.release()
-            return False
-            
-        # Calculate interval, ensuring it's at least 1 frame
-        frames_interval = max(1, total_frames // num_frames)
-        
-        extracted_count = 0
-        for i in range(num_frames):
-            frame_id = i * frames_interval
-            vidcap.set(cv2.CAP_PROP_POS_FRAMES, frame_id)
-            success, image = vidcap.read()
-            if success:
-                save_path = save_dir / f"frame_{extracted_count}.jpg"
-                cv2.imwrite(str(save_path), image)
-                extracted_count += 1
-            else:
-                logger.warning(f"Failed to read frame {frame_id} from {video_path}")
-                # Optionally break if frame read fails
+        total_frames = int(out.decode().strip().rstrip(','))
+    except (AttributeError, ValueError):
+        return None
+    if total_frames < 1:
+        return None
 
-        vidcap.release()
-        logger.info(f"Extracted {extracted_count} frames from {video_path} to {save_dir}")
-        return extracted_count > 0
-    except Exception as e:
-        logger.error(f"Error extracting frames from {video_path}: {e}", exc_info=True)
-        if vidcap.isOpened(): vidcap.release() # Ensure release on error
-        return False
+    num_frames = min(num_frames, total_frames)
+    step = max(1, total_frames // num_frames)
+    # Same grid as _frames_to_mosaic; the tile filter pads a partly filled grid at the end of the stream
+    columns = min(3, num_frames)
+    rows = -(-num_frames // columns)
+    cell_w, cell_h = MOSAIC_MAX_EDGE // columns, MOSAIC_MAX_EDGE // rows
+    out = await _run_media_tool(
+        'ffmpeg', '-v', 'error', '-i', video_path,
+        '-vf', (f"select='not(mod(n\\,{step}))*lt(n\\,{step * num_frames})',"
+                f"scale=w='min({cell_w},iw)':h='min({cell_h},ih)':force_original_aspect_ratio=decrease,"
+                f"tile={columns}x{rows}"),
+        '-vsync', 'vfr', '-frames:v', '1', '-q:v', '5',
+        '-f', 'image2pipe', '-c:v', 'mjpeg', '-'
+    )
+    if not out:
+        return None
+    logger.info(f"Extracted {num_frames} frames from {video_path} with ffmpeg")
+    return [out], num_frames > 1
+
+_claude_client: Optional[anthropic.AsyncAnthropic] = None
 
-def _make_claude_title_request(frames_dir: Path, original_comment: Optional[str]) -> Optional[str]:
-    """Makes a request to Claude API to generate a title based on frames and comment."""
+def _get_claude_client() -> anthropic.AsyncAnthropic:
+    """Returns a shared async Anthropic client, created on first use."""
+    global _claude_client
+    if _claude_client is None:
+        _claude_client = anthropic.AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    return _claude_client
+
+async def _make_claude_title_request(frames: List[bytes], original_comment: Optional[str], is_mosaic: bool = False) -> Optional[str]:
+    """Makes a request to Claude API to generate a title based on JPEG frames (or one frame mosaic) and comment."""
     try:
-        client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-        image_paths = list(frames_dir.glob("*.jpg"))
-        if not image_paths:
+        client = _get_claude_client()
+        if not frames:
             logger.warning("No frames found to send to Claude for title generation.")
             return None
 
         # Limit frames sent if necessary (e.g., API limits)
         max_frames_to_send = 5 # Adjust as needed
-        image_paths = image_paths[:max_frames_to_send]
 
         content = []
-        for image_path in image_paths:
-            base64_image = _image_to_base64(str(image_path))
-            if base64_image:
-                content.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": "image/jpeg",
-                        "data": base64_image
-                    }
-                })
-            else:
-                 logger.warning(f"Skipping image {image_path} due to encoding error.")
-
-        if not any(item['type'] == 'image' for item in content):
-             logger.error("No valid images could be prepared for Claude request.")
-             return None
+        for frame in frames[:max_frames_to_send]:
+            content.append({
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": "image/jpeg",
+                    "data": base64.b64encode(frame).decode('utf-8')
+                }
+            })
 
         # Refined prompt definition
         base_prompt = ("Analyze these video frames. Create a short, interesting, unique title (max 3-4 words). Avoid cliches. "
@@ -275,14 +267,17 @@ def _make_claude_title_request(frames_dir: Path, original_comment: Optional[str]
             prompt = comment_prompt_template.format(comment=original_comment)
         else:
             prompt = base_prompt
+        if is_mosaic:
+            prompt = f"{MOSAIC_NOTE}\n\n{prompt}"
 
         content.append({"type": "text", "text": prompt})
 
-        message = client.messages.create(
+        message = await client.messages.create(
             model="claude-3-5-sonnet-20240620", # Or your preferred model
             max_tokens=50, # Short response expected
             temperature=0.5,
-            messages=[{"role": "user", "content": content}]
+            messages=[{"role": "user", "content": content}],
+            timeout=120
         )
 
         generated_title = message.content[0].text.strip().strip('\"\'') # Clean up output
@@ -298,22 +293,27 @@ def _make_claude_title_request(frames_dir: Path, original_comment: Optional[str]
 
 # --- Main Title Generation Function ---
 
-async def generate_social_media_title(video_path: str, original_comment: Optional[str], post_id: int) -> str:
-    """Generates a social media title using Claude, extracting frames first."""
-    temp_frames_dir = Path(f"./temp_frames_{post_id}")
-    title = "Featured Artwork" # Default fallback title
+DEFAULT_VIDEO_TITLE = "Featured Artwork"
+
+async def generate_social_media_title(video_path: str, original_comment: Optional[str], post_id: int, executor: Optional[Executor] = None) -> str:
+    """Generates a social media title using Claude, extracting frames first (on executor, if given)."""
+    title = DEFAULT_VIDEO_TITLE # Default fallback title
     
     if not os.path.exists(video_path):
         logger.error(f"Video file not found for title generation: {video_path}")
         return title # Return default title
 
     try:
-        # Extract frames
-        if _extract_frames(video_path, num_frames=5, save_dir=temp_frames_dir):
-            # Generate title using Claude
-            generated_title = await asyncio.to_thread(
-                _make_claude_title_request, temp_frames_dir, original_comment
+        # Extract and tile the frames in one ffmpeg pass, falling back to OpenCV (blocking, so off the event loop)
+        extracted = await _extract_mosaic_with_ffmpeg(video_path, 5)
+        if extracted is None:
+            extracted = await asyncio.get_running_loop().run_in_executor(
+                executor, lambda: _encode_frames(_extract_frames(video_path, 5))
             )
+        frames, is_mosaic = extracted
+        if frames:
+            # Generate title using Claude
+            generated_title = await _make_claude_title_request(frames, original_comment, is_mosaic=is_mosaic)
             if generated_title:
                 title = generated_title
             else:
@@ -323,21 +323,13 @@ async def generate_social_media_title(video_path: str, original_comment: Optiona
             
     except Exception as e:
         logger.error(f"Error in title generation process for post {post_id}: {e}", exc_info=True)
-    finally:
-        # Clean up temporary frames directory
-        if temp_frames_dir.exists():
-            try:
-                shutil.rmtree(temp_frames_dir)
-                logger.info(f"Cleaned up temporary frame directory: {temp_frames_dir}")
-            except Exception as e:
-                logger.error(f"Error removing temporary frame directory {temp_frames_dir}: {e}", exc_info=True)
                 
     return title
 
 # --- Main Posting Function ---
 
-async def post_tweet(generated_description: str, user_details: Dict, attachments: List[Dict], original_content: Optional[str]) -> Optional[str]:
-    """Uploads media and posts a tweet with a generated caption."""
+async def post_tweet(generated_description: str, user_details: Dict, attachments: List[Dict], original_content: Optional[str], executor: Optional[Executor] = None) -> Optional[str]:
+    """Uploads media and posts a tweet with a generated caption, running tweepy on executor (if given)."""
     
     if not all([CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET]):
          logger.error("Cannot post tweet, API credentials missing.")
@@ -368,18 +360,18 @@ async def post_tweet(generated_description: str, user_details: Dict, attachments
         auth.set_access_token(ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
         api_v1 = tweepy.API(auth)
         
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         
         logger.info(f"Uploading media ({filename}) to Twitter...")
         if file_extension == '.gif':
             # GIFs need chunked upload and specific media category
-            media = await loop.run_in_executor(None,
+            media = await loop.run_in_executor(executor,
                 lambda: api_v1.media_upload(media_path, chunked=True, media_category="tweet_gif")
             )
         else:
              # Other types (images/videos) - use standard upload (chunked is good practice for videos)
              # Tweepy v1's media_upload handles chunking automatically if file is large enough
-             media = await loop.run_in_executor(None,
+             media = await loop.run_in_executor(executor,
                  lambda: api_v1.media_upload(media_path, chunked=True)
              )
 
@@ -395,7 +387,7 @@ async def post_tweet(generated_description: str, user_details: Dict, attachments
         )
         
         logger.info("Creating tweet...")
-        tweet = await loop.run_in_executor(None,
+        tweet = await loop.run_in_executor(executor,
              lambda: client_v2.create_tweet(text=final_caption, media_ids=[media_id])
         )
 
@@ -420,47 +412,39 @@ async def post_tweet(generated_description: str, user_details: Dict, attachments
 
 # --- Added Zapier Posting Functions ---
 
-def post_to_instagram_via_zapier(payload: Dict):
+async def _post_to_zapier(session: aiohttp.ClientSession, platform_name: str, url: str, payload: Dict, log_key: str) -> bool:
+    """POSTs a payload to a Zapier webhook over the shared session."""
+    try:
+        async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            response.raise_for_status() # Raise exception for bad status codes (4xx or 5xx)
+            logger.info(f"Successfully sent post data to {platform_name} Zapier webhook for {log_key}: {payload.get(log_key)}. Status: {response.status}")
+            return True
+    except aiohttp.ClientResponseError as e:
+        if e.status == 429 or e.status >= 500:
+            raise # Overloaded: let the caller's rate limiter back off and retry
+        logger.error(f"Error posting to {platform_name} Zapier webhook: {e}", exc_info=True)
+        return False
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Error posting to {platform_name} Zapier webhook: {e}", exc_info=True)
+        return False
+
+async def post_to_instagram_via_zapier(session: aiohttp.ClientSession, payload: Dict):
     """Sends data to the Instagram Zapier webhook."""
     if not ZAPIER_INSTAGRAM_URL:
         logger.error("Cannot post to Instagram, ZAPIER_INSTAGRAM_URL not set.")
         return False
-    try:
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(ZAPIER_INSTAGRAM_URL, headers=headers, data=json.dumps(payload), timeout=30)
-        response.raise_for_status() # Raise exception for bad status codes (4xx or 5xx)
-        logger.info(f"Successfully sent post data to Instagram Zapier webhook for jump_url: {payload.get('jump_url')}. Status: {response.status_code}")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error posting to Instagram Zapier webhook: {e}", exc_info=True)
-        return False
+    return await _post_to_zapier(session, "Instagram", ZAPIER_INSTAGRAM_URL, payload, 'jump_url')
 
-def post_to_tiktok_via_zapier(payload: Dict):
+async def post_to_tiktok_via_zapier(session: aiohttp.ClientSession, payload: Dict):
     """Sends data to the TikTok Zapier webhook (via Buffer in example)."""
     if not ZAPIER_TIKTOK_BUFFER_URL:
         logger.error("Cannot post to TikTok, ZAPIER_TIKTOK_BUFFER_URL not set.")
         return False
-    try:
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(ZAPIER_TIKTOK_BUFFER_URL, headers=headers, data=json.dumps(payload), timeout=30)
-        response.raise_for_status()
-        logger.info(f"Successfully sent post data to TikTok Zapier webhook for video_url: {payload.get('video_url')}. Status: {response.status_code}")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error posting to TikTok Zapier webhook: {e}", exc_info=True)
-        return False
+    return await _post_to_zapier(session, "TikTok", ZAPIER_TIKTOK_BUFFER_URL, payload, 'video_url')
 
-def post_to_youtube_via_zapier(payload: Dict):
+async def post_to_youtube_via_zapier(session: aiohttp.ClientSession, payload: Dict):
     """Sends data to the YouTube Zapier webhook."""
     if not ZAPIER_YOUTUBE_URL:
         logger.error("Cannot post to YouTube, ZAPIER_YOUTUBE_URL not set.")
         return False
-    try:
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(ZAPIER_YOUTUBE_URL, headers=headers, data=json.dumps(payload), timeout=30)
-        response.raise_for_status()
-        logger.info(f"Successfully sent post data to YouTube Zapier webhook for jump_url: {payload.get('jump_url')}. Status: {response.status_code}")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error posting to YouTube Zapier webhook: {e}", exc_info=True)
-        return False 
\ No newline at end of file
+    return await _post_to_zapier(session, "YouTube", ZAPIER_YOUTUBE_URL, payload, 'jump_url')
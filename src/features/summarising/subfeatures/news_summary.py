@@ -1,41 +1,41 @@
 import os
 import sys
+import re
 import json
 import logging
-import traceback
-from typing import List, Dict, Any, Optional
+import dataclasses
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
 
 from dotenv import load_dotenv
 
 # Import the shared client
-from src.common.claude_client import ClaudeClient
+from src.common.claude_client import ClaudeClient, ClaudeBatchRunner
+from src.common.schema import MessageRecord
 
 # We removed direct Discord/bot usage here since SUMMARIZER handles posting logic now.
 # This class now focuses on:
 #  - queries to Claude (generate_news_summary, combine_channel_summaries, etc.)
 #  - chunking/formatting the prompt & returned JSON.
 
-class NewsSummarizer:
-    def __init__(self, claude_client: ClaudeClient, logger: logging.Logger, dev_mode=False):
-        self.logger = logger
-        self.logger.info("Initializing NewsSummarizer...")
+# Message compaction before prompting: merge quick follow-ups, truncate walls of text
+MERGE_WINDOW_SECONDS = 60
+LONG_MESSAGE_CHARS = 2000
+LONG_MESSAGE_PREVIEW_CHARS = 200
+# Signed/expiring query strings on Discord CDN links are pure token noise for the model
+_CDN_QUERY_RE = re.compile(r'(https://(?:cdn|media)\.discordapp\.(?:com|net)/\S+?)\?\S*')
 
-        load_dotenv()
-        self.dev_mode = dev_mode
-
-        if self.dev_mode:
-            self.guild_id = int(os.getenv('DEV_GUILD_ID'))
-        else:
-            self.guild_id = int(os.getenv('GUILD_ID'))
+# Below this many channels a batch job isn't worth the queueing delay
+BATCH_MIN_CHANNELS = 5
 
-        # Store the passed Claude client instead of creating a new one
-        self.claude_client = claude_client
-        self.logger.info("NewsSummarizer initialized with shared Claude client.")
+# The short summary is a 4-line block, so a small model and a tight output budget are enough
+SHORT_SUMMARY_MODEL = "claude-haiku-4-5"
+SHORT_SUMMARY_MAX_TOKENS = 256
 
-    def format_messages_for_claude(self, messages):
-        """Format messages for Claude analysis."""
-        conversation = """You MUST respond with ONLY a JSON array containing news items. NO introduction text, NO explanation, NO markdown formatting.
+# Static formatting rules sent as a cached system block; only the transcript changes per call
+NEWS_INSTRUCTIONS = """You MUST respond with ONLY a JSON array containing news items. NO introduction text, NO explanation, NO markdown formatting.
 
 If there are no significant news items, respond with exactly "[NO SIGNIFICANT NEWS]".
 Otherwise, respond with ONLY a JSON array in this exact format:
@@ -115,37 +115,120 @@ Requirements for the response:
 8. Don't repeat the same item or leave any empty fields (except optional `mainMediaMessageId` and `subTopicMediaMessageIds`).
 9. When you're referring to groups of community members, refer to them as Banodocians.
 10. Don't be hyperbolic or overly enthusiastic.
-11. If something seems to be a subjective opinion but still noteworthy, mention it as such: "**Draken** felt...", etc.
+11. If something seems to be a subjective opinion but still noteworthy, mention it as such: "**Draken** felt...", etc."""
 
-Here are the messages to analyze:
+SHORT_SUMMARY_INSTRUCTIONS = """Create exactly 3 bullet points summarizing key developments. STRICT format requirements:
+1. The FIRST LINE MUST BE EXACTLY: 📨 __{message_count} messages sent__ (using the message count given below)
+2. Then three bullet points that:
+   - Start with -
+   - Give a short summary of one of the main topics from the full summary - priotise topics that are related to the channel and are likely to be useful to others.
+   - Bold the most important finding/result/insight using **
+   - Keep each to a single line
+4. DO NOT MODIFY THE MESSAGE COUNT OR FORMAT IN ANY WAY
 
-"""
+Required format:
+"📨 __{message_count} messages sent__
+• [Main topic 1] 
+• [Main topic 2]
+• [Main topic 3]"
+DO NOT CHANGE THE MESSAGE COUNT LINE. IT MUST BE EXACTLY AS SHOWN ABOVE. DO NOT ADD INCLUDE ELSE IN THE MESSAGE OTHER THAN THE ABOVE."""
+
+
+def _cached_system(text: str) -> List[Dict[str, Any]]:
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral", "ttl": "1h"}}]
+
+
+NEWS_SYSTEM = _cached_system(NEWS_INSTRUCTIONS)
+SHORT_SUMMARY_SYSTEM = _cached_system(SHORT_SUMMARY_INSTRUCTIONS)
+
+
+class NewsSummarizer:
+    chunk_size = 1000
+
+    def __init__(self, claude_client: ClaudeClient, logger: logging.Logger, dev_mode=False):
+        self.logger = logger
+        self.logger.info("Initializing NewsSummarizer...")
+
+        load_dotenv()
+        self.dev_mode = dev_mode
+
+        if self.dev_mode:
+            self.guild_id = int(os.getenv('DEV_GUILD_ID'))
+        else:
+            self.guild_id = int(os.getenv('GUILD_ID'))
+
+        # Store the passed Claude client instead of creating a new one
+        self.claude_client = claude_client
+        self.batch_runner = ClaudeBatchRunner(claude_client)
+        self.logger.info("NewsSummarizer initialized with shared Claude client.")
+
+    @staticmethod
+    def _parse_time(created_at: str) -> Optional[datetime]:
+        try:
+            return datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            return None
+
+    def _compact_messages(self, messages: List[MessageRecord]) -> List[MessageRecord]:
+        """
+        Drop and condense low-signal content before it reaches Claude:
+        empty messages are dropped, CDN query strings stripped, very long messages truncated,
+        and plain-text follow-ups by the same author within MERGE_WINDOW_SECONDS merged into the previous message.
+        """
+        compacted: List[MessageRecord] = []
+        for msg in messages:
+            content = _CDN_QUERY_RE.sub(r'\1', msg.content or '').strip()
+            if not content and not msg.attachments:
+                continue
+            if len(content) > LONG_MESSAGE_CHARS:
+                content = f"[long message by {msg.author_name}: {content[:LONG_MESSAGE_PREVIEW_CHARS]}…]"
+
+            prev = compacted[-1] if compacted else None
+            if (prev is not None and prev.author_id == msg.author_id
+                    and not msg.attachments and not msg.reaction_count):
+                prev_time, msg_time = self._parse_time(prev.created_at), self._parse_time(msg.created_at)
+                if prev_time and msg_time and abs((prev_time - msg_time).total_seconds()) <= MERGE_WINDOW_SECONDS:
+                    # Keep chronological order inside the merged text whichever way the list is sorted
+                    merged = f"{prev.content}\n{content}" if prev_time <= msg_time else f"{content}\n{prev.content}"
+                    compacted[-1] = dataclasses.replace(prev, content=merged)
+                    continue
+
+            compacted.append(msg if content == msg.content else dataclasses.replace(msg, content=content))
+        return compacted
+
+    def format_messages_for_claude(self, messages: List[MessageRecord]):
+        """Format messages for Claude analysis."""
+        total = len(messages)
+        messages = self._compact_messages(messages)
+        top_authors = ", ".join(name for name, _ in Counter(m.author_name for m in messages).most_common(3))
+        file_count = sum(len(m.attachments) for m in messages)
+        channel_label = f"Channel {messages[0].channel_id}" if messages else "Channel"
+
+        parts = [
+            "Here are the messages to analyze:\n\n",
+            f"{channel_label}: {total} msgs, top authors: {top_authors}; files: {file_count}\n\n"
+        ]
+        append = parts.append
 
         for msg in messages:
-            conversation += f"=== Message from {msg['author_name']} ===\n"
-            conversation += f"Time: {msg['created_at']}\n"
-            conversation += f"Content: {msg['content']}\n"
-            if msg['reaction_count']:
-                conversation += f"Reactions: {msg['reaction_count']}\n"
-            if msg['attachments']:
-                conversation += "Attachments:\n"
-                for attach in msg['attachments']:
+            append(f"=== Message from {msg.author_name} ===\nTime: {msg.created_at}\nContent: {msg.content}\n")
+            if msg.reaction_count:
+                append(f"Reactions: {msg.reaction_count}\n")
+            if msg.attachments:
+                append("Attachments:\n")
+                for attach in msg.attachments:
                     if isinstance(attach, dict):
-                        # url = attach.get('url', '') # Don't send the URL
-                        filename = attach.get('filename', '')
                         # Only send the filename to avoid confusing the LLM with attachment IDs
-                        conversation += f"- {filename}\n"
+                        append(f"- {attach.get('filename', '')}\n")
                     else:
                         # Fallback if not a dict
-                        conversation += f"- {attach}\n"
-            conversation += f"Message ID: {msg['message_id']}\n"
-            conversation += f"Channel ID: {msg['channel_id']}\n"
-            conversation += "\n"
+                        append(f"- {attach}\n")
+            append(f"Message ID: {msg.message_id}\nChannel ID: {msg.channel_id}\n\n")
 
-        conversation += "\nRemember: Respond with ONLY the JSON array or '[NO SIGNIFICANT NEWS]'. NO other text."
-        return conversation
+        append("\nRemember: Respond with ONLY the JSON array or '[NO SIGNIFICANT NEWS]'. NO other text.")
+        return "".join(parts)
 
-    async def generate_news_summary(self, messages: List[Dict[str, Any]]) -> str:
+    async def generate_news_summary(self, messages: List[MessageRecord]) -> str:
         """
         Generate a news summary from a given list of messages
         by sending them to Claude in chunks if needed.
@@ -154,7 +237,7 @@ Here are the messages to analyze:
             self.logger.warning("No messages to analyze")
             return "[NO MESSAGES TO ANALYZE]"
 
-        chunk_size = 1000
+        chunk_size = self.chunk_size
         chunk_summaries = []
         previous_summary = None
 
@@ -177,7 +260,8 @@ If all significant topics have already been covered, respond with "[NO SIGNIFICA
                 text = await self.claude_client.generate_text(
                     content=prompt,
                     model="claude-3-5-sonnet-latest",
-                    max_tokens=8192
+                    max_tokens=8192,
+                    system_prompt=NEWS_SYSTEM
                 )
                 self.logger.debug(f"Claude response for chunk summary: {text}") # Log raw response
                 if text and text not in ["[NOTHING OF NOTE]", "[NO SIGNIFICANT NEWS]", "[NO MESSAGES TO ANALYZE]"]:
@@ -188,7 +272,7 @@ If all significant topics have already been covered, respond with "[NO SIGNIFICA
                         previous_summary = text
             except Exception as e:
                 self.logger.error(f"Error during generate_news_summary call via ClaudeClient: {e}")
-                self.logger.debug(traceback.format_exc())
+                self.logger.debug("Traceback:", exc_info=True)
 
         if not chunk_summaries:
             return "[NO SIGNIFICANT NEWS]"
@@ -199,6 +283,37 @@ If all significant topics have already been covered, respond with "[NO SIGNIFICA
         # If multiple chunk summaries, combine them
         return await self.combine_channel_summaries(chunk_summaries)
 
+    async def generate_news_summaries(self, histories: Dict[int, List[MessageRecord]], use_batches: bool = False) -> Dict[int, str]:
+        """
+        Summarize several channels at once. With use_batches, single-chunk channels go through one
+        Message Batches job when there are enough of them; the rest use generate_news_summary.
+        """
+        summaries: Dict[int, str] = {}
+        batchable = {cid: msgs for cid, msgs in histories.items() if msgs and len(msgs) <= self.chunk_size}
+
+        if use_batches and len(batchable) >= BATCH_MIN_CHANNELS:
+            try:
+                results = await self.batch_runner.run(
+                    {f"sum-{cid}": self.format_messages_for_claude(msgs) for cid, msgs in batchable.items()},
+                    model="claude-3-5-sonnet-latest",
+                    max_tokens=8192,
+                    system_prompt=NEWS_SYSTEM
+                )
+                for cid in batchable:
+                    text = results.get(f"sum-{cid}")
+                    if text is not None:
+                        summaries[cid] = text
+            except Exception as e:
+                self.logger.error(f"Batch summarization failed, falling back to per-channel calls: {e}")
+                self.logger.debug("Traceback:", exc_info=True)
+
+        # Multi-chunk channels, failed batch requests, or too few channels to batch.
+        # Run concurrently; ClaudeClient's bulkhead bounds how many are in flight.
+        remaining = [cid for cid, msgs in histories.items() if msgs and cid not in summaries]
+        results = await asyncio.gather(*(self.generate_news_summary(histories[cid]) for cid in remaining))
+        summaries.update(zip(remaining, results))
+        return summaries
+
     def format_news_for_discord(self, news_items_json: str) -> List[Dict[str, str]]:
         """
         Convert the JSON string from Claude into a list of dictionaries
@@ -292,8 +407,7 @@ Otherwise, respond with ONLY a JSON array. No extra text.
 Here are the input summaries:
 """
 
-        for s in summaries:
-            prompt += f"\n{s}\n"
+        prompt += "".join(f"\n{s}\n" for s in summaries)
 
         prompt += "\nReturn just the final JSON array with the top items (or '[NO SIGNIFICANT NEWS]')."
 
@@ -307,36 +421,28 @@ Here are the input summaries:
             return text if text else "[NO SIGNIFICANT NEWS]"
         except Exception as e:
             self.logger.error(f"Error combining summaries via ClaudeClient: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return "[NO SIGNIFICANT NEWS]"
 
+    def _short_summary_prompt(self, full_summary: str, message_count: int) -> List[Dict[str, Any]]:
+        # The full summary leads and is cached, so retries or repeat calls for the same channel read it from cache
+        return [
+            {"type": "text", "text": f"Full summary to work from:\n{full_summary}", "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": f"Message count: {message_count}"}
+        ]
+
     async def generate_short_summary(self, full_summary: str, message_count: int) -> str:
         """
         Get a short summary using Claude with proper async handling.
         """
-        conversation = f"""Create exactly 3 bullet points summarizing key developments. STRICT format requirements:
-1. The FIRST LINE MUST BE EXACTLY: 📨 __{message_count} messages sent__
-2. Then three bullet points that:
-   - Start with -
-   - Give a short summary of one of the main topics from the full summary - priotise topics that are related to the channel and are likely to be useful to others.
-   - Bold the most important finding/result/insight using **
-   - Keep each to a single line
-4. DO NOT MODIFY THE MESSAGE COUNT OR FORMAT IN ANY WAY
-
-Required format:
-"📨 __{message_count} messages sent__
-• [Main topic 1] 
-• [Main topic 2]
-• [Main topic 3]"
-DO NOT CHANGE THE MESSAGE COUNT LINE. IT MUST BE EXACTLY AS SHOWN ABOVE. DO NOT ADD INCLUDE ELSE IN THE MESSAGE OTHER THAN THE ABOVE.
-
-Full summary to work from:
-{full_summary}"""
+        conversation = self._short_summary_prompt(full_summary, message_count)
 
         text = await self.claude_client.generate_text(
             content=conversation,
-            model="claude-3-5-haiku-latest",
-            max_tokens=8192,
+            model=SHORT_SUMMARY_MODEL,
+            max_tokens=SHORT_SUMMARY_MAX_TOKENS,
+            system_prompt=SHORT_SUMMARY_SYSTEM,
+            temperature=0.2,
             max_retries=3
         )
 
@@ -347,6 +453,34 @@ Full summary to work from:
         else:
             return f"📨 __{message_count} messages sent__\n• Unable to generate short summary due to API error after retries."
 
+    async def generate_short_summaries(self, summaries: Dict[int, Tuple[str, int]], use_batches: bool = False) -> Dict[int, str]:
+        """
+        Short summaries for several channels, keyed like the input of (full_summary, message_count).
+        With use_batches, uses one batch job when there are enough channels, otherwise generate_short_summary.
+        """
+        short_summaries: Dict[int, str] = {}
+
+        if use_batches and len(summaries) >= BATCH_MIN_CHANNELS:
+            try:
+                results = await self.batch_runner.run(
+                    {f"short-{cid}": self._short_summary_prompt(full, count) for cid, (full, count) in summaries.items()},
+                    model=SHORT_SUMMARY_MODEL,
+                    max_tokens=SHORT_SUMMARY_MAX_TOKENS,
+                    system_prompt=SHORT_SUMMARY_SYSTEM,
+                    temperature=0.2
+                )
+                for cid in summaries:
+                    text = results.get(f"short-{cid}")
+                    if text:
+                        short_summaries[cid] = text
+            except Exception as e:
+                self.logger.error(f"Batch short summarization failed, falling back to per-channel calls: {e}")
+                self.logger.debug("Traceback:", exc_info=True)
+
+        remaining = [cid for cid in summaries if cid not in short_summaries]
+        results = await asyncio.gather(*(self.generate_short_summary(*summaries[cid]) for cid in remaining))
+        short_summaries.update(zip(remaining, results))
+        return short_summaries
 
 if __name__ == "__main__":
     def main():
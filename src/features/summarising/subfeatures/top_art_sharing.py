@@ -6,7 +6,7 @@ import asyncio
 import traceback
 import discord
 from typing import Optional, TYPE_CHECKING
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # Import Sharer for type hinting
 if TYPE_CHECKING:
@@ -34,7 +34,7 @@ class TopArtSharing:
 
             self.bot.logger.info(f"Using Art channel ID: {art_channel_id}")
 
-            yesterday = datetime.utcnow() - timedelta(hours=24)
+            yesterday = self.bot._get_run_date() - timedelta(hours=24)
             # Updated query to get author_id directly
             query = """
                 SELECT 
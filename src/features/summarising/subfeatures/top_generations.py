@@ -3,10 +3,19 @@ import re
 import json
 import sqlite3
 import asyncio
-import traceback
 import discord
 from typing import Optional, List, Dict
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+_MENTION_RE = re.compile(r'<@!?(\d+)>')
+_VIDEO_EXTENSIONS = ('.mp4', '.mov', '.webm')
+
+def _first_video(attachments: List[Dict]) -> Optional[Dict]:
+    """Return the first attachment whose filename has a video extension."""
+    for attachment in attachments:
+        if attachment.get('filename', '').lower().endswith(_VIDEO_EXTENSIONS):
+            return attachment
+    return None
 
 class TopGenerations:
     def __init__(self, bot):
@@ -30,7 +39,7 @@ class TopGenerations:
         """
         try:
             self.bot.logger.info("Starting post_top_x_generations")
-            yesterday = datetime.utcnow() - timedelta(hours=24)
+            yesterday = self.bot._get_run_date() - timedelta(hours=24)
 
             art_channel_id = int(os.getenv('DEV_ART_CHANNEL_ID' if self.bot.dev_mode else 'ART_CHANNEL_ID', 0))
             
@@ -133,13 +142,11 @@ class TopGenerations:
             
             first_gen = top_generations[0]
             attachments = json.loads(first_gen['attachments'])
+            # Resolve the mentions for every generation up front in one query
+            display_names = self._lookup_display_names([gen['content'][:150] for gen in top_generations if gen['content']])
             
             # Find a video attachment in the first (top) generation
-            video_attachment = next(
-                (a for a in attachments if any(a.get('filename', '').lower().endswith(ext) 
-                                               for ext in ('.mp4', '.mov', '.webm'))),
-                None
-            )
+            video_attachment = _first_video(attachments)
             if not video_attachment:
                 return None
                 
@@ -152,7 +159,7 @@ class TopGenerations:
             
             # If there's text content, trim and un-mention
             if first_gen['content'] and first_gen['content'].strip():
-                desc.append(self._replace_user_mentions(first_gen['content'][:150]))
+                desc.append(self._replace_user_mentions(first_gen['content'][:150], display_names))
             
             desc.append(f"🔥 {first_gen['unique_reactor_count']} unique reactions")
             desc.append(video_attachment['url'])
@@ -179,11 +186,7 @@ class TopGenerations:
                 for i, row in enumerate(top_generations[1:], start=2):
                     gen = dict(row)
                     attachments = json.loads(gen['attachments'])
-                    video_attachment = next(
-                        (a for a in attachments if any(a.get('filename', '').lower().endswith(ext)
-                                                       for ext in ('.mp4', '.mov', '.webm'))),
-                        None
-                    )
+                    video_attachment = _first_video(attachments)
                     if not video_attachment:
                         continue
                     
@@ -192,7 +195,7 @@ class TopGenerations:
                     ]
                     
                     if gen['content'] and gen['content'].strip():
-                        desc.append(self._replace_user_mentions(gen['content'][:150]))
+                        desc.append(self._replace_user_mentions(gen['content'][:150], display_names))
                     
                     desc.append(f"🔥 {gen['unique_reactor_count']} unique reactions")
                     desc.append(video_attachment['url'])
@@ -209,7 +212,7 @@ class TopGenerations:
 
         except Exception as e:
             self.bot.logger.error(f"Error in post_top_x_generations: {e}")
-            self.bot.logger.debug(traceback.format_exc())
+            self.bot.logger.debug("Traceback:", exc_info=True)
             return None
 
     async def post_top_gens_for_channel(self, thread: discord.Thread, channel_id: int):
@@ -220,7 +223,7 @@ class TopGenerations:
         try:
             self.bot.logger.info(f"Posting top gens for channel {channel_id} in thread {thread.name}")
             
-            yesterday = datetime.utcnow() - timedelta(hours=24)
+            yesterday = self.bot._get_run_date() - timedelta(hours=24)
             
             query = """
                 SELECT 
@@ -270,15 +273,12 @@ class TopGenerations:
                 return
 
             await self.bot.safe_send_message(thread, "\n## Top Generations\n")
+            display_names = self._lookup_display_names([row['content'][:150] for row in results if row['content']])
             
             for i, row in enumerate(results, start=1):
                 try:
                     attachments = json.loads(row['attachments'])
-                    video_attachment = next(
-                        (a for a in attachments if any(a.get('filename', '').lower().endswith(ext)
-                                                       for ext in ('.mp4', '.mov', '.webm'))),
-                        None
-                    )
+                    video_attachment = _first_video(attachments)
                     if not video_attachment:
                         continue
                     
@@ -288,7 +288,7 @@ class TopGenerations:
                     ]
                     
                     if row['content'] and row['content'].strip():
-                        desc.append(self._replace_user_mentions(row['content'][:150]))
+                        desc.append(self._replace_user_mentions(row['content'][:150], display_names))
                     
                     desc.append(video_attachment['url'])
                     # Generate jump URL dynamically
@@ -301,34 +301,42 @@ class TopGenerations:
                     
                 except Exception as e:
                     self.bot.logger.error(f"Error processing generation {i}: {e}")
-                    self.bot.logger.debug(traceback.format_exc())
+                    self.bot.logger.debug("Traceback:", exc_info=True)
                     continue
 
             self.bot.logger.info(f"Successfully posted top generations for channel {channel_id}")
 
         except Exception as e:
             self.bot.logger.error(f"Error in post_top_gens_for_channel: {e}")
-            self.bot.logger.debug(traceback.format_exc())
+            self.bot.logger.debug("Traceback:", exc_info=True)
 
-    def _replace_user_mentions(self, text: str) -> str:
+    def _lookup_display_names(self, texts: List[str]) -> Dict[str, str]:
         """
-        Replace <@123...> with @username lookups from DB for more readable messages.
+        Resolve every user mentioned across texts with a single members query.
         """
+        user_ids = {uid for text in texts if text for uid in _MENTION_RE.findall(text)}
+        if not user_ids:
+            return {}
         cursor = self.bot.db.conn.cursor()
-
-        def replace_mention(match):
-            user_id = match.group(1)
+        try:
+            placeholders = ",".join("?" * len(user_ids))
             cursor.execute(
-                """
-                SELECT COALESCE(server_nick, global_name, username) as display_name 
-                FROM members 
-                WHERE member_id = ?
+                f"""
+                SELECT member_id, COALESCE(server_nick, global_name, username) as display_name
+                FROM members
+                WHERE member_id IN ({placeholders})
                 """,
-                (user_id,)
+                tuple(user_ids)
             )
-            result = cursor.fetchone()
-            return f"@{result[0] if result else 'unknown'}"
-
-        escaped_content = re.sub(r'<@!?(\d+)>', replace_mention, text)
-        return escaped_content
+            return {str(row[0]): row[1] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
 
+    def _replace_user_mentions(self, text: str, display_names: Optional[Dict[str, str]] = None) -> str:
+        """
+        Replace <@123...> with @username lookups from DB for more readable messages.
+        Pass display_names from _lookup_display_names to avoid a query per mention.
+        """
+        if display_names is None:
+            display_names = self._lookup_display_names([text])
+        return _MENTION_RE.sub(lambda match: f"@{display_names.get(match.group(1)) or 'unknown'}", text)
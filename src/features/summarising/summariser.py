@@ -1,15 +1,19 @@
 # Standard library imports
 import asyncio
 
+import functools
+import heapq
 import io
+import itertools
 import json
 import logging
 import os
 import re
-
+import contextlib
+import tempfile
 import traceback
 from datetime import datetime, timedelta
-from typing import List, Tuple, Set, Dict, Optional, Any, Union
+from typing import List, Tuple, Set, Dict, Optional, Any, Union, Callable, Awaitable
 import sqlite3
 
 import time
@@ -18,14 +22,15 @@ import time
 import aiohttp
 import discord
 from discord.ext import commands
-from dotenv import load_dotenv
 
 # Local imports
 from src.common.db_handler import DatabaseHandler
 from src.common.errors import *
 from src.common.error_handler import ErrorHandler, handle_errors
 from src.common.rate_limiter import RateLimiter
+from src.common.circuit_breaker import CircuitBreaker
 from src.common.log_handler import LogHandler
+from src.common.schema import MessageRecord
 from src.common.base_bot import BaseDiscordBot
 
 # Import the new shared Claude client
@@ -47,6 +52,12 @@ try:
 except ImportError:
     MEDIA_PROCESSING_AVAILABLE = False
 
+# Patterns used when chunking summaries for Discord
+_DISCORD_LINK_RE = re.compile(r'https://discord\.com/channels/\d+/\d+/(\d+)')
+# Each section emoji is a single codepoint, so membership of line[:1] is one hash probe.
+# Switch back to line.startswith(tuple) if a multi-codepoint emoji is ever added.
+_SECTION_EMOJI_SET = frozenset({'🎥', '💻', '🎬', '🤖', '📱', '🔧', '🎨', '📊'})
+
 ################################################################################
 # You may already have a scheduling function somewhere, but here is a simple stub:
 ################################################################################
@@ -93,180 +104,257 @@ class SummaryError(ChannelSummarizerError):
     pass
 
 class Attachment:
-    def __init__(self, filename: str, data: bytes, content_type: str, reaction_count: int, username: str, content: str = ""):
+    def __init__(self, filename: str, data: Optional[bytes], content_type: str, reaction_count: int, username: str, content: str = "",
+                 fetch: Optional[Callable[[], Awaitable[Optional[bytes]]]] = None):
         self.filename = filename
         self.data = data
         self.content_type = content_type
         self.reaction_count = reaction_count
         self.username = username
         self.content = content
+        # Downloads the bytes on demand so unused attachments are never held in memory
+        self._fetch = fetch
+
+    async def load(self) -> Optional[bytes]:
+        """Download the attachment's bytes if they haven't been loaded yet."""
+        if self.data is None and self._fetch is not None:
+            self.data = await self._fetch()
+            self._fetch = None
+        return self.data
 
 class AttachmentHandler:
+    """
+    Downloads and caches message attachments as discord.File inputs.
+
+    Not currently wired into the summary flow: nothing calls process_attachment,
+    so prepare_files and get_all_files_sorted only ever see an empty cache.
+    """
+
     def __init__(self, logger: logging.Logger, max_size: int = 25 * 1024 * 1024):
         self.max_size = max_size
-        self.attachment_cache: Dict[str, Dict[str, Any]] = {}
+        # Partitioned by channel: {channel_id: {message_id: entry}}
+        self.attachment_cache: Dict[int, Dict[int, Dict[str, Any]]] = {}
         self.logger = logger
+        # Bound concurrent downloads to stay within Discord CDN per-host limits
+        self._dl_sem = asyncio.Semaphore(8)
+        # Sorted view of all cached attachments, rebuilt only after the cache changes
+        self._sorted_cache: Optional[List[Attachment]] = None
+        self._dirty = True
         
     def clear_cache(self):
         """Clear the attachment cache"""
         self.attachment_cache.clear()
+        self._dirty = True
         
-    async def process_attachment(self, attachment: discord.Attachment, message: discord.Message, session: aiohttp.ClientSession) -> Optional[Attachment]:
-        """Process a single attachment with size and type validation."""
+    async def process_attachment(self, attachment: discord.Attachment, message: discord.Message, session: aiohttp.ClientSession, *, reaction_count: Optional[int] = None) -> Optional[Attachment]:
+        """
+        Process a single attachment with size and type validation.
+        Only metadata is cached here; the bytes are downloaded by Attachment.load() when needed.
+        Pass reaction_count when the caller has already summed the message's reactions.
+        """
         try:
-            cache_key = f"{message.channel.id}:{message.id}"
-
-            async with session.get(attachment.url, timeout=300) as response:
-                if response.status != 200:
-                    raise APIError(f"Failed to download attachment: HTTP {response.status}")
-
-                file_data = await response.read()
-                if len(file_data) > self.max_size:
-                    self.logger.warning(f"Skipping large file {attachment.filename} ({len(file_data)/1024/1024:.2f}MB)")
-                    return None
+            # Discord reports the size up front, so oversize files are skipped without downloading
+            if attachment.size and attachment.size > self.max_size:
+                self.logger.warning(f"Skipping large file {attachment.filename} ({attachment.size/1024/1024:.2f}MB)")
+                return None
 
+            if reaction_count is not None:
+                total_reactions = reaction_count
+            else:
                 total_reactions = sum(reaction.count for reaction in message.reactions) if message.reactions else 0
-                
-                # Get guild display name (nickname) if available, otherwise use display name
-                author_name = message.author.display_name
-                if hasattr(message.author, 'guild'):
-                    member = message.guild.get_member(message.author.id)
-                    if member:
-                        author_name = member.nick or member.display_name
-
-                processed_attachment = Attachment(
-                    filename=attachment.filename,
-                    data=file_data,
-                    content_type=attachment.content_type,
-                    reaction_count=total_reactions,
-                    username=author_name,  # Use the determined name
-                    content=message.content
-                )
+        
+            # Get guild display name (nickname) if available, otherwise use display name
+            author_name = message.author.display_name
+            if hasattr(message.author, 'guild'):
+                member = message.guild.get_member(message.author.id)
+                if member:
+                    author_name = member.nick or member.display_name
+
+            processed_attachment = Attachment(
+                filename=attachment.filename,
+                data=None,
+                content_type=attachment.content_type,
+                reaction_count=total_reactions,
+                username=author_name,  # Use the determined name
+                content=message.content,
+                fetch=functools.partial(self._download, attachment.url, attachment.filename, session)
+            )
 
-                # Ensure the cache key structure is consistent
-                if cache_key not in self.attachment_cache:
-                    self.attachment_cache[cache_key] = {
-                        'attachments': [],
-                        'reaction_count': total_reactions,
-                        'username': author_name,
-                        'channel_id': str(message.channel.id)
-                    }
-                self.attachment_cache[cache_key]['attachments'].append(processed_attachment)
+            # Ensure the cache entry structure is consistent
+            channel_cache = self.attachment_cache.setdefault(message.channel.id, {})
+            if message.id not in channel_cache:
+                channel_cache[message.id] = {
+                    'attachments': [],
+                    'reaction_count': total_reactions,
+                    'username': author_name,
+                    'channel_id': str(message.channel.id)
+                }
+            channel_cache[message.id]['attachments'].append(processed_attachment)
+            self._dirty = True
 
-                return processed_attachment
+            return processed_attachment
 
         except Exception as e:
             self.logger.error(f"Failed to process attachment {attachment.filename}: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return None
 
-    async def prepare_files(self, message_ids: List[str], channel_id: str) -> List[Tuple[discord.File, int, str, str]]:
-        """Prepare Discord files from cached attachments."""
-        files = []
+    async def _download(self, url: str, filename: str, session: aiohttp.ClientSession) -> Optional[bytes]:
+        """Download an attachment, giving up once it passes max_size."""
+        try:
+            async with self._dl_sem:
+                async with session.get(url, timeout=300) as response:
+                    if response.status != 200:
+                        raise APIError(f"Failed to download attachment: HTTP {response.status}")
+
+                    # Reject oversize files up front when the server tells us the size
+                    content_length = response.headers.get('Content-Length')
+                    if content_length and int(content_length) > self.max_size:
+                        self.logger.warning(f"Skipping large file {filename} ({int(content_length)/1024/1024:.2f}MB)")
+                        return None
+
+                    # Otherwise stream it and abort as soon as we pass max_size
+                    buf = bytearray()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        buf.extend(chunk)
+                        if len(buf) > self.max_size:
+                            self.logger.warning(f"Skipping large file {filename} (exceeded {self.max_size/1024/1024:.2f}MB)")
+                            return None
+                    return bytes(buf)
+
+        except Exception as e:
+            self.logger.error(f"Failed to download attachment {filename}: {e}")
+            self.logger.debug("Traceback:", exc_info=True)
+            return None
+
+    async def prepare_files(self, message_ids: List[Union[str, int]], channel_id: Union[str, int]) -> List[Tuple[discord.File, int, str, str]]:
+        """Prepare Discord files from cached attachments, downloading only the top 10 by reactions."""
+        candidates = []
+        channel_cache = self.attachment_cache.get(int(channel_id), {})
         for message_id in message_ids:
-            # Use composite key to look up attachments
-            cache_key = f"{channel_id}:{message_id}"
-            if cache_key in self.attachment_cache:
-                for attachment in self.attachment_cache[cache_key]['attachments']:
-                    try:
-                        file = discord.File(
-                            io.BytesIO(attachment.data),
-                            filename=attachment.filename,
-                            description=f"From message ID: {message_id} (🔥 {attachment.reaction_count} reactions)"
-                        )
-                        files.append((
-                            file,
-                            attachment.reaction_count,
-                            message_id,
-                            attachment.username
-                        ))
-                    except Exception as e:
-                        self.logger.error(f"Failed to prepare file {attachment.filename}: {e}")
-                        continue
+            entry = channel_cache.get(int(message_id))
+            if entry:
+                for attachment in entry['attachments']:
+                    candidates.append((attachment, message_id))
+
+        # nlargest keeps only the top 10 rather than sorting every candidate
+        top = heapq.nlargest(10, candidates, key=lambda x: x[0].reaction_count)
+        await asyncio.gather(*(attachment.load() for attachment, _ in top))
+
+        files = []
+        for attachment, message_id in top:
+            if attachment.data is None:
+                continue
+            try:
+                file = discord.File(
+                    io.BytesIO(attachment.data),
+                    filename=attachment.filename,
+                    description=f"From message ID: {message_id} (🔥 {attachment.reaction_count} reactions)"
+                )
+                files.append((
+                    file,
+                    attachment.reaction_count,
+                    message_id,
+                    attachment.username
+                ))
+            except Exception as e:
+                self.logger.error(f"Failed to prepare file {attachment.filename}: {e}")
+                continue
 
-        return sorted(files, key=lambda x: x[1], reverse=True)[:10]
+        return files
 
     def get_all_files_sorted(self) -> List[Attachment]:
         """
         Retrieve all attachments sorted by reaction count in descending order.
         """
-        all_attachments = []
-        for channel_data in self.attachment_cache.values():
-            all_attachments.extend(channel_data['attachments'])
-        
-        # Sort attachments by reaction_count in descending order
-        sorted_attachments = sorted(all_attachments, key=lambda x: x.reaction_count, reverse=True)
-        return sorted_attachments
+        if self._dirty or self._sorted_cache is None:
+            all_attachments = itertools.chain.from_iterable(
+                entry['attachments']
+                for channel_cache in self.attachment_cache.values()
+                for entry in channel_cache.values()
+            )
+            # Sort attachments by reaction_count in descending order
+            self._sorted_cache = sorted(all_attachments, key=lambda x: x.reaction_count, reverse=True)
+            self._dirty = False
+        return list(self._sorted_cache)
 
 class MessageFormatter:
     @staticmethod
     def format_usernames(usernames: List[str]) -> str:
         """Format a list of usernames with proper grammar and bold formatting."""
-        unique_usernames = list(dict.fromkeys(usernames))
-        if not unique_usernames:
+        return MessageFormatter._format_usernames_cached(tuple(usernames))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _format_usernames_cached(usernames: Tuple[str, ...]) -> str:
+        """Cached implementation of format_usernames keyed on the username tuple."""
+        wrapped = tuple(name if name.startswith('**') else f"**{name}**" for name in dict.fromkeys(usernames))
+        if not wrapped:
             return ""
         
-        formatted_usernames = []
-        for username in unique_usernames:
-            if not username.startswith('**'):
-                username = f"**{username}**"
-            formatted_usernames.append(username)
-        
-        if len(formatted_usernames) == 1:
-            return formatted_usernames[0]
+        if len(wrapped) == 1:
+            return wrapped[0]
         
-        return f"{', '.join(formatted_usernames[:-1])} and {formatted_usernames[-1]}"
+        return f"{', '.join(wrapped[:-1])} and {wrapped[-1]}"
 
     @staticmethod
     def chunk_content(content: str, max_length: int = 1900) -> List[Tuple[str, Set[str]]]:
         """Split content into chunks while preserving message links."""
         chunks = []
-        current_chunk = ""
+        # Accumulate pieces in a list and join once per chunk to avoid quadratic string copies
+        current_chunk: List[str] = []
+        current_len = 0
         current_chunk_links = set()
 
         for line in content.split('\n'):
-            message_links = set(re.findall(r'https://discord\.com/channels/\d+/\d+/(\d+)', line))
+            # Most lines have no links, so skip the regex scan for them
+            message_links = set(_DISCORD_LINK_RE.findall(line)) if 'discord.com/channels/' in line else set()
             
             # Start new chunk if we hit an emoji or length limit
-            if (any(line.startswith(emoji) for emoji in ['🎥', '💻', '🎬', '🤖', '📱', '🔧', '🎨', '📊']) and 
-                current_chunk):
-                if current_chunk:
-                    chunks.append((current_chunk, current_chunk_links))
-                current_chunk = ""
+            if line[:1] in _SECTION_EMOJI_SET and current_chunk:
+                chunks.append(("".join(current_chunk), current_chunk_links))
+                current_chunk = ['\n---\n\n']
+                current_len = len(current_chunk[0])
                 current_chunk_links = set()
-                current_chunk += '\n---\n\n'
 
-            if len(current_chunk) + len(line) + 2 <= max_length:
-                current_chunk += line + '\n'
+            if current_len + len(line) + 2 <= max_length:
+                current_chunk.append(line)
+                current_chunk.append('\n')
+                current_len += len(line) + 1
                 current_chunk_links.update(message_links)
             else:
                 if current_chunk:
-                    chunks.append((current_chunk, current_chunk_links))
-                current_chunk = line + '\n'
+                    chunks.append(("".join(current_chunk), current_chunk_links))
+                current_chunk = [line, '\n']
+                current_len = len(line) + 1
                 current_chunk_links = set(message_links)
 
         if current_chunk:
-            chunks.append((current_chunk, current_chunk_links))
+            chunks.append(("".join(current_chunk), current_chunk_links))
 
         return chunks
 
     def chunk_long_content(self, content: str, max_length: int = 1900) -> List[str]:
         """Split content into chunks that respect Discord's length limits."""
         chunks = []
-        current_chunk = ""
+        current_chunk: List[str] = []
+        current_len = 0
         
         lines = content.split('\n')
         
         for line in lines:
-            if len(current_chunk) + len(line) + 1 <= max_length:
-                current_chunk += line + '\n'
+            if current_len + len(line) + 1 <= max_length:
+                current_chunk.append(line)
+                current_chunk.append('\n')
+                current_len += len(line) + 1
             else:
                 if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = line + '\n'
+                    chunks.append("".join(current_chunk).strip())
+                current_chunk = [line, '\n']
+                current_len = len(line) + 1
         
         if current_chunk:
-            chunks.append(current_chunk.strip())
+            chunks.append("".join(current_chunk).strip())
         
         return chunks
 
@@ -289,6 +377,14 @@ class ChannelSummarizer(BaseDiscordBot):
         try:
             # Initialize handlers
             self.rate_limiter = RateLimiter()
+            # Bound concurrent Discord sends and stop hammering Discord while it's failing
+            self.discord_bulkhead = asyncio.Semaphore(8)
+            self.discord_breaker = CircuitBreaker(
+                'discord',
+                is_failure=lambda e: isinstance(e, asyncio.TimeoutError) or (
+                    isinstance(e, discord.HTTPException) and (e.status == 429 or e.status >= 500)
+                )
+            )
             self.attachment_handler = AttachmentHandler(logger=self.logger)
             self.message_formatter = MessageFormatter()
             self.db = DatabaseHandler(dev_mode=dev_mode)
@@ -321,8 +417,11 @@ class ChannelSummarizer(BaseDiscordBot):
             self.summary_channel_id = None
             self.channels_to_monitor = []
             self.dev_channels_to_monitor = []
+            self.test_data_channel_ids = []
             self.first_message = None
             self._summary_lock = asyncio.Lock()
+            # Timestamp of the summary run in progress, shared so every step agrees on "now"
+            self._run_date: Optional[datetime] = None
             self._cleanup_lock = asyncio.Lock()
             self._shutdown_flag = False
             self.current_summary_attachments = []
@@ -331,6 +430,10 @@ class ChannelSummarizer(BaseDiscordBot):
             
             self._channel_cache = {}
             self._last_cache_refresh = None
+            # time.monotonic() of the last connection check; immune to wall-clock jumps
+            self._last_heartbeat: float = 0.0
+            # (monitored channel ids, rendered query) so the static config isn't re-expanded every run
+            self._production_query_cache: Optional[Tuple[Tuple[int, ...], str]] = None
             self._cache_ttl = 300  # 5 minutes
             self._max_retries = 3
             self._retry_delay = 5  # seconds
@@ -342,7 +445,7 @@ class ChannelSummarizer(BaseDiscordBot):
             
         except Exception as e:
             self.logger.error(f"Error during ChannelSummarizer initialization: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             raise
 
     def setup_logger(self, dev_mode):
@@ -369,15 +472,6 @@ class ChannelSummarizer(BaseDiscordBot):
     def load_config(self):
         """Load configuration based on mode"""
         self.logger.debug("Loading configuration...")
-        self.logger.debug(f"Current TEST_DATA_CHANNEL: {os.getenv('TEST_DATA_CHANNEL')}")
-        
-        load_dotenv(override=True)
-        self.logger.debug(f"After reload TEST_DATA_CHANNEL: {os.getenv('TEST_DATA_CHANNEL')}")
-        
-        self.logger.debug("All channel-related environment variables:")
-        for key, value in os.environ.items():
-            if 'CHANNEL' in key:
-                self.logger.debug(f"{key}: {value}")
         
         try:
             if self.dev_mode:
@@ -392,6 +486,11 @@ class ChannelSummarizer(BaseDiscordBot):
                     self.logger.info(f"DEV_CHANNELS_TO_MONITOR: {self.dev_channels_to_monitor}")
                 except ValueError as e:
                     raise ConfigurationError(f"Invalid channel ID in DEV_CHANNELS_TO_MONITOR: {e}")
+                try:
+                    self.test_data_channel_ids = [int(chan.strip()) for chan in os.getenv('TEST_DATA_CHANNEL', '').split(',') if chan.strip()]
+                    self.logger.info(f"TEST_DATA_CHANNEL: {self.test_data_channel_ids}")
+                except ValueError as e:
+                    raise ConfigurationError(f"Invalid channel ID in TEST_DATA_CHANNEL: {e}")
             else:
                 self.logger.info("Loading production configuration")
                 self.guild_id = int(os.getenv('GUILD_ID'))
@@ -459,7 +558,9 @@ class ChannelSummarizer(BaseDiscordBot):
             await super().on_ready()
             
             notification_channel = self.get_channel(self.summary_channel_id)
-            if not notification_channel:
+            if notification_channel:
+                self._channel_cache[self.summary_channel_id] = {'channel': notification_channel, 'timestamp': time.monotonic()}
+            else:
                 self.logger.error(f"Could not find summary channel with ID {self.summary_channel_id}")
                 self.logger.info("Available channels:")
                 for guild in self.guilds:
@@ -473,9 +574,9 @@ class ChannelSummarizer(BaseDiscordBot):
             
         except Exception as e:
             self.logger.error(f"Error in on_ready: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
 
-    async def get_channel_history(self, channel_id: int, db_handler: Optional[DatabaseHandler] = None) -> List[dict]:
+    async def get_channel_history(self, channel_id: int, db_handler: Optional[DatabaseHandler] = None) -> List[MessageRecord]:
         """Get message history for a channel from the database (past 24h)."""
         self.logger.info(f"Getting message history for channel {channel_id} from database")
         
@@ -486,23 +587,6 @@ class ChannelSummarizer(BaseDiscordBot):
                 # Create a new connection for this thread
                 thread_local_db = DatabaseHandler(dev_mode=self.dev_mode)
                 try:
-                    # Get total message count
-                    cursor = thread_local_db.conn.cursor()
-                    cursor.execute("""
-                        SELECT COUNT(*) as count 
-                        FROM messages 
-                        WHERE channel_id = ? 
-                        AND created_at > ?
-                    """, (channel_id, yesterday.isoformat()))
-                    total_count = cursor.fetchone()[0]
-                    cursor.close()
-
-                    self.logger.info(f"Found {total_count} messages in past 24h for channel {channel_id}")
-
-                    if total_count == 0:
-                        return []
-
-                    # Get all messages
                     thread_local_db.conn.row_factory = sqlite3.Row
                     cursor = thread_local_db.conn.cursor()
                     cursor.execute("""
@@ -514,37 +598,19 @@ class ChannelSummarizer(BaseDiscordBot):
                         WHERE m.channel_id = ?
                         AND m.created_at > ?
                         AND (m.is_deleted IS NULL OR m.is_deleted = FALSE)
+                        AND (mem.bot IS NULL OR mem.bot = FALSE)
+                        AND (mem.system IS NULL OR mem.system = FALSE)
                         ORDER BY m.created_at DESC
                     """, (channel_id, yesterday.isoformat()))
                     
-                    messages = [dict(row) for row in cursor.fetchall()]
-                    cursor.close()
-                    
                     formatted_messages = []
-                    for msg in messages:
-                        try:
-                            attachments = json.loads(msg['attachments']) if msg['attachments'] else []
-                            reactors = json.loads(msg['reactors']) if msg['reactors'] else []
-                            
-                            formatted_msg = {
-                                'message_id': msg['message_id'],
-                                'channel_id': msg['channel_id'],
-                                'author_id': msg['author_id'],
-                                'content': msg['content'],
-                                'created_at': msg['created_at'],
-                                'attachments': attachments,
-                                'reaction_count': msg['reaction_count'],
-                                'reactors': reactors,
-                                'reference_id': msg['reference_id'],
-                                'thread_id': msg['thread_id'],
-                                'author_name': msg['display_name']
-                            }
+                    for row in cursor:
+                        formatted_msg = self._format_history_row(row)
+                        if formatted_msg is not None:
                             formatted_messages.append(formatted_msg)
-                        except Exception as e:
-                            self.logger.error(f"Error formatting message {msg.get('message_id')}: {e}")
-                            self.logger.debug(traceback.format_exc())
-                            continue
+                    cursor.close()
 
+                    self.logger.info(f"Found {len(formatted_messages)} messages in past 24h for channel {channel_id}")
                     return formatted_messages
                 finally:
                     thread_local_db.close()
@@ -553,24 +619,63 @@ class ChannelSummarizer(BaseDiscordBot):
 
         except Exception as e:
             self.logger.error(f"Error retrieving message history: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return []
 
+    async def fetch_all_histories(self, channel_ids: List[int], max_concurrency: int = 4) -> Dict[int, List[MessageRecord]]:
+        """Fetch the past 24h of history for several channels concurrently."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(channel_id):
+            async with semaphore:
+                return await self.get_channel_history(channel_id)
+
+        results = await asyncio.gather(*(fetch(cid) for cid in channel_ids), return_exceptions=True)
+        histories = {}
+        for channel_id, result in zip(channel_ids, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error fetching history for channel {channel_id}: {result}")
+                continue
+            histories[channel_id] = result
+        return histories
+
+    def _format_history_row(self, row: sqlite3.Row) -> Optional[MessageRecord]:
+        """Convert a messages row (joined with members) into the record used for summaries."""
+        try:
+            return MessageRecord(
+                message_id=row['message_id'],
+                channel_id=row['channel_id'],
+                author_id=row['author_id'],
+                author_name=row['display_name'],
+                content=row['content'],
+                created_at=row['created_at'],
+                reaction_count=row['reaction_count'],
+                attachments=json.loads(row['attachments']) if row['attachments'] else []
+            )
+        except Exception as e:
+            self.logger.error(f"Error formatting message {row['message_id']}: {e}")
+            self.logger.debug("Traceback:", exc_info=True)
+            return None
+
     @handle_errors("safe_send_message")
     async def safe_send_message(self, channel, content=None, embed=None, file=None, files=None, reference=None):
         """Safely send a message with concurrency-limited retry logic."""
         try:
-            send_task = self.rate_limiter.execute(
-                f"channel_{channel.id}",
-                channel.send(
-                    content=content,
-                    embed=embed,
-                    file=file,
-                    files=files,
-                    reference=reference
+            async with self.discord_bulkhead, self.discord_breaker:
+                send_task = self.rate_limiter.execute(
+                    f"channel_{channel.id}",
+                    lambda: channel.send(
+                        content=content,
+                        embed=embed,
+                        file=file,
+                        files=files,
+                        reference=reference
+                    )
                 )
-            )
-            return await asyncio.wait_for(send_task, timeout=10)
+                return await asyncio.wait_for(send_task, timeout=10)
+        except CircuitOpenError:
+            self.logger.error(f"Discord circuit open, not sending message to channel {channel.id}")
+            raise
         except asyncio.TimeoutError:
             self.logger.error(f"Timeout sending message to channel {channel.id}")
             raise
@@ -581,8 +686,44 @@ class ChannelSummarizer(BaseDiscordBot):
             self.logger.error(f"Error sending message: {e}")
             raise
 
+    async def _run_media_tool(self, *args: str) -> Optional[bytes]:
+        """Run ffmpeg/ffprobe and return its stdout, or None if it's missing or fails."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            self.logger.debug(f"{args[0]} not found on PATH")
+            return None
+        stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            self.logger.debug(f"{args[0]} exited with {proc.returncode}: {stderr.decode(errors='replace')[-500:]}")
+            return None
+        return stdout
+
+    async def _probe_video(self, path: str) -> Optional[Tuple[bool, Tuple]]:
+        """Return (has_audio, stream signature) for a video file via ffprobe."""
+        out = await self._run_media_tool(
+            'ffprobe', '-v', 'error', '-show_entries', 'stream=codec_type,codec_name,width,height',
+            '-of', 'json', path
+        )
+        if out is None:
+            return None
+        try:
+            streams = json.loads(out).get('streams', [])
+        except json.JSONDecodeError:
+            return None
+        has_audio = any(st.get('codec_type') == 'audio' for st in streams)
+        # Stream copy only works when every input has the same codecs and frame size
+        signature = tuple(sorted(
+            (st.get('codec_type', ''), st.get('codec_name', ''), st.get('width', 0), st.get('height', 0))
+            for st in streams
+        ))
+        return has_audio, signature
+
     async def create_media_content(self, files: List[Tuple[discord.File, int, str, str]], max_media: int = 4) -> Optional[discord.File]:
         """Create a collage of images or a combined video, depending on attachments."""
+        tempfiles: List[str] = []
         try:
             if not MEDIA_PROCESSING_AVAILABLE:
                 self.logger.error("Media processing libraries are not available")
@@ -590,13 +731,24 @@ class ChannelSummarizer(BaseDiscordBot):
             
             self.logger.info(f"Starting media content creation with {len(files)} files")
             
+            def make_temp_path(suffix: str) -> str:
+                fd, path = tempfile.mkstemp(suffix=suffix, prefix='summary_media_')
+                os.close(fd)
+                tempfiles.append(path)
+                return path
+            
             images = []
-            videos = []
+            video_paths = []
+            signatures = set()
             has_audio = False
             
             for file_tuple, _, _, _ in files[:max_media]:
-                file_tuple.fp.seek(0)
-                data = file_tuple.fp.read()
+                # prepare_files wraps the bytes in a BytesIO; read them without depending on the stream position
+                if isinstance(file_tuple.fp, io.BytesIO):
+                    data = file_tuple.fp.getvalue()
+                else:
+                    file_tuple.fp.seek(0)
+                    data = file_tuple.fp.read()
                 
                 if file_tuple.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
                     self.logger.debug(f"Processing image: {file_tuple.filename}")
@@ -604,43 +756,69 @@ class ChannelSummarizer(BaseDiscordBot):
                     images.append(img)
                 elif file_tuple.filename.lower().endswith(('.mp4', '.mov', '.webm')):
                     self.logger.debug(f"Processing video: {file_tuple.filename}")
-                    temp_path = f'temp_{len(videos)}.mp4'
+                    temp_path = make_temp_path('.mp4')
                     with open(temp_path, 'wb') as f:
                         f.write(data)
-                    video = mp.VideoFileClip(temp_path)
-                    if video.audio is not None:
+                    probe = await self._probe_video(temp_path)
+                    if probe is not None:
+                        video_has_audio, signature = probe
+                        signatures.add(signature)
+                    else:
+                        # No ffprobe: open the clip just to check for an audio track
+                        with mp.VideoFileClip(temp_path) as video:
+                            video_has_audio = video.audio is not None
+                        signatures.add(None)
+                    if video_has_audio:
                         has_audio = True
                         self.logger.debug(f"Video {file_tuple.filename} has audio")
-                    videos.append(video)
+                    video_paths.append(temp_path)
             
-            self.logger.info(f"Processed {len(images)} images and {len(videos)} videos. Has audio: {has_audio}")
+            self.logger.info(f"Processed {len(images)} images and {len(video_paths)} videos. Has audio: {has_audio}")
                 
-            if videos and has_audio:
+            if video_paths and has_audio:
                 self.logger.info("Creating combined video with audio")
-                final_video = mp.concatenate_videoclips(videos)
-                output_path = 'combined_video.mp4'
-                final_video.write_videofile(output_path)
-                
-                for video in videos:
-                    video.close()
-                final_video.close()
+                output_path = make_temp_path('.mp4')
+                combined = False
+                if len(signatures) == 1 and None not in signatures:
+                    # Matching codecs: let ffmpeg copy the streams instead of decoding every frame in Python
+                    list_path = make_temp_path('.txt')
+                    with open(list_path, 'w') as f:
+                        f.writelines(f"file '{path}'\n" for path in video_paths)
+                    combined = await self._run_media_tool(
+                        'ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', list_path, '-c', 'copy', output_path
+                    ) is not None
+                if not combined:
+                    self.logger.debug("Falling back to moviepy to re-encode the combined video")
+                    videos = [mp.VideoFileClip(path) for path in video_paths]
+                    final_video = mp.concatenate_videoclips(videos)
+                    final_video.write_videofile(output_path)
+                    for video in videos:
+                        video.close()
+                    final_video.close()
                 
                 self.logger.info("Video combination complete")
                 
-                with open(output_path, 'rb') as f:
-                    return discord.File(f, filename='combined_video.mp4')
+                # Hand discord.py the path so the upload streams from disk instead of a second in-memory copy.
+                # discord.File opens it immediately, so removing the path in the finally block is safe.
+                return discord.File(output_path, filename='combined_video.mp4')
                 
-            elif images or (videos and not has_audio):
+            elif images or (video_paths and not has_audio):
                 self.logger.info("Creating image/GIF collage")
                 
                 # Convert silent videos to GIF
-                for i, video in enumerate(videos):
+                for i, video_path in enumerate(video_paths):
                     self.logger.debug(f"Converting silent video {i+1} to GIF")
-                    gif_path = f'temp_gif_{len(images)}.gif'
-                    video.write_gif(gif_path)
+                    gif_path = make_temp_path('.gif')
+                    converted = await self._run_media_tool(
+                        'ffmpeg', '-y', '-v', 'error', '-i', video_path,
+                        '-vf', 'fps=10,scale=400:-1', '-t', '3', gif_path
+                    ) is not None
+                    if not converted:
+                        with mp.VideoFileClip(video_path) as video:
+                            video.write_gif(gif_path)
                     gif_img = Image.open(gif_path)
                     images.append(gif_img)
-                    video.close()
                 
                 if not images:
                     self.logger.warning("No images available for collage")
@@ -660,8 +838,10 @@ class ChannelSummarizer(BaseDiscordBot):
                 resized_images = []
                 for i, img in enumerate(images):
                     self.logger.debug(f"Resizing image {i+1}/{len(images)} to {target_size}")
-                    img = img.convert('RGB')
-                    img.thumbnail(target_size)
+                    if img.mode != 'RGB':
+                        img = img.convert('RGB')
+                    # Tiles are small, so bilinear with a JPEG draft pre-reduction is plenty
+                    img.thumbnail(target_size, Image.BILINEAR, reducing_gap=2.0)
                     resized_images.append(img)
                 
                 collage = Image.new('RGB', (800, 800))
@@ -674,7 +854,7 @@ class ChannelSummarizer(BaseDiscordBot):
                 self.logger.info("Collage creation complete")
                 
                 buffer = io.BytesIO()
-                collage.save(buffer, format='JPEG')
+                collage.save(buffer, format='JPEG', quality=85, optimize=False)
                 buffer.seek(0)
                 return discord.File(buffer, filename='collage.jpg')
             
@@ -682,19 +862,13 @@ class ChannelSummarizer(BaseDiscordBot):
             
         except Exception as e:
             self.logger.error(f"Error creating media content: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return None
         finally:
-            # Cleanup
-            import os
-            self.logger.debug("Cleaning up temporary files")
-            for f in os.listdir():
-                if f.startswith('temp_'):
-                    try:
-                        os.remove(f)
-                        self.logger.debug(f"Removed temporary file: {f}")
-                    except Exception as ex:
-                        self.logger.warning(f"Failed to remove temporary file {f}: {ex}")
+            self.logger.debug(f"Cleaning up {len(tempfiles)} temporary files")
+            for path in tempfiles:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
 
     async def create_summary_thread(self, message, thread_name, is_top_generations=False):
         try:
@@ -732,9 +906,19 @@ class ChannelSummarizer(BaseDiscordBot):
                 if not is_top_generations:
                     try:
                         pinned_messages = await message.channel.pins()
-                        for pinned_msg in pinned_messages:
-                            if pinned_msg.author.id == self.user.id:
+                        own_pins = [p for p in pinned_messages if p.author.id == self.user.id]
+                        # Unpin concurrently, staying within the pins route's 5-per-5s limit
+                        unpin_sem = asyncio.Semaphore(5)
+
+                        async def unpin(pinned_msg):
+                            async with unpin_sem:
                                 await pinned_msg.unpin()
+
+                        results = await asyncio.gather(*(unpin(p) for p in own_pins), return_exceptions=True)
+                        for pinned_msg, result in zip(own_pins, results):
+                            if isinstance(result, Exception):
+                                self.logger.error(f"Error unpinning message {pinned_msg.id}: {result}")
+                            else:
                                 self.logger.info(f"Unpinned previous message: {pinned_msg.id}")
                     except Exception as e:
                         self.logger.error(f"Error unpinning previous messages: {e}")
@@ -752,15 +936,15 @@ class ChannelSummarizer(BaseDiscordBot):
                 
         except discord.Forbidden as e:
             self.logger.error(f"Forbidden error creating thread: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return None
         except discord.HTTPException as e:
             self.logger.error(f"HTTP error creating thread: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return None
         except Exception as e:
             self.logger.error(f"Error creating thread: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return None
 
 
@@ -787,6 +971,12 @@ class ChannelSummarizer(BaseDiscordBot):
                             self.logger.error(f"Error closing self.http._session: {e}")
                         finally:
                             self.http._session = None
+
+                if getattr(self, 'sharer_instance', None):
+                    try:
+                        await self.sharer_instance.aclose()
+                    except Exception as e:
+                        self.logger.error(f"Error closing sharer session: {e}")
                 
                 # Close DB
                 if hasattr(self, 'db'):
@@ -804,11 +994,11 @@ class ChannelSummarizer(BaseDiscordBot):
                     await super().cleanup()
                 except Exception as e:
                     self.logger.error(f"Error in Discord cleanup: {e}")
-                    self.logger.debug(traceback.format_exc())
+                    self.logger.debug("Traceback:", exc_info=True)
                 
             except Exception as e:
                 self.logger.error(f"Error during cleanup: {e}")
-                self.logger.debug(traceback.format_exc())
+                self.logger.debug("Traceback:", exc_info=True)
             finally:
                 self._shutdown_flag = False
 
@@ -823,21 +1013,26 @@ class ChannelSummarizer(BaseDiscordBot):
 
     async def _wait_for_connection(self, timeout=30):
         """Wait for the bot to be fully connected."""
-        start_time = time.time()
-        while not self.is_ready():
-            if time.time() - start_time > timeout:
-                raise TimeoutError("Timed out waiting for bot to be ready")
-            await asyncio.sleep(1)
+        if not self.is_ready():
+            # Block on discord.py's ready event rather than polling it every second
+            try:
+                async with asyncio.timeout(timeout):
+                    await self.wait_until_ready()
+            except TimeoutError:
+                raise TimeoutError("Timed out waiting for bot to be ready") from None
         
-        if not self._last_heartbeat:
-            self._last_heartbeat = datetime.now()
-        elif (datetime.now() - self._last_heartbeat).total_seconds() > 30:
+        now = time.monotonic()
+        if self._last_heartbeat and now - self._last_heartbeat > 30:
             self.logger.warning("No recent heartbeat detected, proceeding and resetting heartbeat")
-            self._last_heartbeat = datetime.now()
+        self._last_heartbeat = now
+
+    def invalidate_channel(self, channel_id: int):
+        """Drop a channel from the lookup cache after it changes or is deleted."""
+        self._channel_cache.pop(channel_id, None)
 
     async def _get_channel_with_retry(self, channel_id: int) -> Optional[discord.TextChannel]:
         """Get a channel with retry logic and caching."""
-        now = time.time()
+        now = time.monotonic()
         if channel_id in self._channel_cache:
             cache_entry = self._channel_cache[channel_id]
             if now - cache_entry['timestamp'] < self._cache_ttl:
@@ -887,14 +1082,15 @@ class ChannelSummarizer(BaseDiscordBot):
             return await loop.run_in_executor(None, thread_safe_operation, *args)
         except Exception as e:
             self.logger.error(f"Database operation failed: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             raise
 
-    async def _post_summary_with_transaction(self, channel_id: int, summary: str, messages: list, current_date: datetime, db_handler: DatabaseHandler) -> bool:
+    async def _post_summary_with_transaction(self, channel_id: int, summary: str, messages: list, current_date: datetime, db_handler: DatabaseHandler, short_summary: Optional[str] = None) -> bool:
         """Atomic operation for posting summary and updating database"""
         try:
-            # Generate a short summary using the NewsSummarizer
-            short_summary = await self.news_summarizer.generate_short_summary(summary, len(messages))
+            # Generate a short summary using the NewsSummarizer unless the caller already has one
+            if short_summary is None:
+                short_summary = await self.news_summarizer.generate_short_summary(summary, len(messages))
             
             def transaction(db, short_sum):
                 conn = db._get_connection()
@@ -935,13 +1131,199 @@ class ChannelSummarizer(BaseDiscordBot):
             
         except Exception as e:
             self.logger.error(f"Error in _post_summary_with_transaction: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             return False
 
+    async def _fetch_media_messages(self, formatted_summary: List[Dict[str, Any]], max_concurrency: int = 5) -> Dict[Tuple[int, int], Optional[discord.Message]]:
+        """Fetch the source messages behind a summary's media references concurrently."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(source_channel_id: int, message_id: int) -> Optional[discord.Message]:
+            async with semaphore:
+                source_channel = await self._get_channel_with_retry(source_channel_id)
+                if not source_channel:
+                    self.logger.warning(f"Could not find source channel {source_channel_id} for media message {message_id}")
+                    return None
+                try:
+                    return await source_channel.fetch_message(message_id)
+                except discord.NotFound:
+                    self.logger.warning(f"Original message {message_id} not found in channel {source_channel_id}.")
+                except discord.Forbidden:
+                    self.logger.error(f"Forbidden to fetch message {message_id} from channel {source_channel_id}.")
+                except discord.HTTPException as e:
+                    self.logger.error(f"HTTP error fetching message {message_id}: {e}")
+                return None
+
+        # Ordered dict keys dedupe in O(n) while keeping first-seen order
+        keys: Dict[Tuple[int, int], None] = {}
+        for item in formatted_summary:
+            if item.get('type') != 'media_reference':
+                continue
+            try:
+                keys[(int(item['channel_id']), int(item['message_id']))] = None
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        results = await asyncio.gather(*(fetch(*key) for key in keys), return_exceptions=True)
+        media_messages = {}
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error fetching media message {key[1]}: {result}")
+                result = None
+            media_messages[key] = result
+        return media_messages
+
+    async def _post_formatted_summary(self, destination, formatted_summary: List[Dict[str, Any]]):
+        """Post a formatted summary's text and referenced media, in order."""
+        # Fetch every referenced media message concurrently, then post in order
+        media_messages = await self._fetch_media_messages(formatted_summary)
+        # A message referenced by several topics only has its media posted once
+        posted_media = set()
+        for item in formatted_summary:
+            if item.get('type') == 'media_reference':
+                try:
+                    message_id_to_fetch = int(item['message_id'])
+                    media_key = (int(item['channel_id']), message_id_to_fetch)
+                    original_message = media_messages.get(media_key)
+                    if original_message is None or media_key in posted_media:
+                        continue
+                    posted_media.add(media_key)
+
+                    # Post attachments if they exist
+                    if original_message.attachments:
+                        for attachment in original_message.attachments:
+                            await self.safe_send_message(destination, attachment.url)
+                            await asyncio.sleep(0.5) # Small delay between attachments
+                    else:
+                        self.logger.info(f"Message {message_id_to_fetch} referenced for media has no attachments.")
+
+                except Exception as e:
+                    self.logger.error(f"Error processing media reference {item}: {e}")
+                    self.logger.debug("Traceback:", exc_info=True)
+            else:
+                # Send as regular text content
+                await self.safe_send_message(destination, item.get('content', ''))
+                await asyncio.sleep(1)
+
+    async def _process_channel(self, channel_info: Dict[str, Any], histories: Dict[int, List[MessageRecord]],
+                               summaries: Dict[int, str], short_summaries: Dict[int, str],
+                               current_date: datetime, db_handler: DatabaseHandler) -> Optional[str]:
+        """Post one channel's summary to its thread and store it. Returns the summary if it was stored."""
+        channel_id = channel_info['channel_id']
+        post_channel_id = channel_info.get('post_channel_id', channel_id)
+
+        try:
+            messages = histories.get(channel_id)
+            if not messages:
+                return None
+
+            channel_summary = summaries.get(channel_id)
+            if not channel_summary or channel_summary in [
+                "[NOTHING OF NOTE]", 
+                "[NO SIGNIFICANT NEWS]",
+                "[NO MESSAGES TO ANALYZE]"
+            ]:
+                return None
+
+            # Post to the channel (unless it's a forum); one cached lookup serves both checks
+            channel_obj = await self._get_channel_with_retry(post_channel_id)
+            if not isinstance(channel_obj, discord.ForumChannel):
+                if channel_obj:
+                    formatted_summary = self.news_summarizer.format_news_for_discord(channel_summary)
+                    loop = asyncio.get_running_loop()
+                    def get_existing_thread_id():
+                        def op(conn):
+                            cursor = conn.cursor()
+                            query = """
+                                SELECT summary_thread_id 
+                                FROM channel_summary 
+                                WHERE channel_id = ? 
+                                AND created_at >= datetime('now', 'start of month')
+                                AND created_at < datetime('now', 'start of month', '+1 month')
+                                ORDER BY created_at DESC LIMIT 1
+                            """
+                            cursor.execute(query, (channel_id,))
+                            row = cursor.fetchone()
+                            cursor.close()
+                            return row[0] if row and row[0] else None
+                        return db_handler._execute_with_retry(op)
+
+                    existing_thread_id = await loop.run_in_executor(None, get_existing_thread_id)
+                    thread = None
+                    if existing_thread_id:
+                        max_retries = 3
+                        retry_delay = 1
+                        for attempt in range(max_retries):
+                            try:
+                                thread = await self.fetch_channel(existing_thread_id)
+                                break
+                            except discord.NotFound:
+                                self.logger.warning(f"Thread {existing_thread_id} not found, will create new one")
+                                break
+                            except (discord.HTTPException, discord.Forbidden) as e:
+                                if attempt < max_retries - 1:
+                                    self.logger.warning(f"Error fetching thread {existing_thread_id} (attempt {attempt + 1}/{max_retries}): {e}")
+                                    await asyncio.sleep(retry_delay * (attempt + 1))
+                                else:
+                                    self.logger.error(f"Failed to fetch thread {existing_thread_id} after {max_retries} attempts: {e}")
+                                    return None
+
+                    # Create new thread if we don't have one yet (either no existing_thread_id or failed to fetch)
+                    if not thread:
+                        self.logger.info(f"No existing thread found for channel {channel_id}, creating new one")
+                        thread_title = f"#{channel_obj.name} - Monthly Summary - {current_date.strftime('%B, %Y')}"
+                        self.logger.info(f"Attempting to send header message with title: {thread_title}")
+                        summary_message = await self.safe_send_message(channel_obj, f"Summary thread for {current_date.strftime('%B, %Y')}")
+                        if summary_message:
+                            self.logger.info(f"Header message sent to channel {channel_id}. Attempting to create a new thread with title: {thread_title}")
+                            thread = await self.create_summary_thread(summary_message, thread_title)
+                            if thread:
+                                self.logger.info(f"Successfully created summary thread for channel {channel_id}: {thread.id}")
+                                await loop.run_in_executor(None, db_handler.update_summary_thread, channel_id, thread.id)
+                            else:
+                                self.logger.error(f"Failed to create thread for channel {channel_id} - create_summary_thread returned None")
+                        else:
+                            self.logger.error(f"Failed to send header message to channel {channel_id}")
+
+                    if thread:
+                        self.logger.info(f"Using summary thread in channel {post_channel_id}: {thread.id}")
+                        # Post date headline first and capture the header message
+                        date_headline = f"# {current_date.strftime('%A, %B %d, %Y')}\n"
+                        header_msg = await self.safe_send_message(thread, date_headline)
+                        await asyncio.sleep(1)
+                        await self._post_formatted_summary(thread, formatted_summary)
+
+                        # Post top gens for the specific channel into this thread
+                        await self.top_generations.post_top_gens_for_channel(thread, channel_id)
+                        # Generate and post short summary with link back using the header message's id
+                        short_summary = short_summaries[channel_id]
+                        link = f"https://discord.com/channels/{channel_obj.guild.id}/{thread.id}/{header_msg.id}"
+                        await self.safe_send_message(thread, f"\n---\n\n***Click here to jump to the beginning of today's summary:***{link}")
+                        channel_header = f"**### Channel summary for {current_date.strftime('%A, %B %d, %Y')}**"
+                        await self.safe_send_message(channel_obj, f"{channel_header}{short_summary}\n[Click here to jump to the summary thread]({link})")
+                    else:
+                        self.logger.error(f"Failed to create or fetch thread for channel {channel_id}")
+
+            # Store it in DB
+            success = await self._post_summary_with_transaction(
+                channel_id,
+                channel_summary,
+                messages,
+                current_date,
+                db_handler,
+                short_summary=short_summaries.get(channel_id)
+            )
+            return channel_summary if success else None
+        except Exception as e:
+            self.logger.error(f"Error processing channel {channel_id}: {e}")
+            self.logger.debug("Traceback:", exc_info=True)
+            return None
+
     @handle_errors("generate_summary")
-    async def generate_summary(self):
+    async def generate_summary(self, use_batches: bool = False):
         """
-        Generate and post summaries following these steps:
+        Generate and post summaries following these steps (use_batches sends the Claude
+        calls through the Message Batches API, for scheduled runs that can wait):
         1) Generate individual channel summaries and post to their channels (except for forum channels)
         2) Combine channel summaries for overall summary
         3) Post overall summary to summary channel
@@ -951,13 +1333,14 @@ class ChannelSummarizer(BaseDiscordBot):
         try:
             async with self._summary_lock:
                 self.logger.info("Generating requested summary...")
+                self._run_date = datetime.utcnow()
                 db_handler = DatabaseHandler(dev_mode=self.dev_mode)
                 try:
                     # Get summary channel first to avoid undefined variable issues
-                    summary_channel_id = int(os.getenv('DEV_SUMMARY_CHANNEL_ID' if self.dev_mode else 'PRODUCTION_SUMMARY_CHANNEL_ID'))
-                    summary_channel = self.get_channel(summary_channel_id)
+                    summary_channel_id = self.summary_channel_id
+                    summary_channel = await self._get_channel_with_retry(summary_channel_id)
                     if not summary_channel:
-                        self.logger.error(f"Could not find summary channel {summary_channel_id}")
+                        self.logger.error(f"Could not find summary channel {summary_channel_id} after {self._max_retries} attempts")
                         return
 
                     def add_columns(db):
@@ -979,13 +1362,8 @@ class ChannelSummarizer(BaseDiscordBot):
                                 cursor.close()
                     
                     await self._execute_db_operation(add_columns)
-
-                    summary_channel = await self._get_channel_with_retry(self.summary_channel_id)
-                    if not summary_channel:
-                        self.logger.error(f"Could not find summary channel {self.summary_channel_id} after {self._max_retries} attempts")
-                        return
                     
-                    current_date = datetime.utcnow()
+                    current_date = self._run_date
 
                     # We'll handle channel picking ourselves:
                     if self.dev_mode:
@@ -1000,156 +1378,32 @@ class ChannelSummarizer(BaseDiscordBot):
                     channel_summaries = []
                     self.logger.info("Processing individual summaries for channels with 25+ messages:")
                     
-                    for channel_info in active_channels:
-                        channel_id = channel_info['channel_id']
-                        post_channel_id = channel_info.get('post_channel_id', channel_id)
-                        
-                        try:
-                            messages = await self.get_channel_history(channel_id, db_handler)
-                            if not messages:
-                                continue
-                            
-                            # === Call into NewsSummarizer to summarize these messages ===
-                            channel_summary = await self.news_summarizer.generate_news_summary(messages)
-                            if not channel_summary or channel_summary in [
-                                "[NOTHING OF NOTE]", 
-                                "[NO SIGNIFICANT NEWS]",
-                                "[NO MESSAGES TO ANALYZE]"
-                            ]:
-                                continue
-                            
-                            # Post to the channel (unless it's a forum)
-                            if not self.is_forum_channel(post_channel_id):
-                                channel_obj = await self._get_channel_with_retry(post_channel_id)
-                                if channel_obj:
-                                    formatted_summary = self.news_summarizer.format_news_for_discord(channel_summary)
-                                    loop = asyncio.get_running_loop()
-                                    def get_existing_thread_id():
-                                        def op(conn):
-                                            cursor = conn.cursor()
-                                            query = """
-                                                SELECT summary_thread_id 
-                                                FROM channel_summary 
-                                                WHERE channel_id = ? 
-                                                AND strftime('%Y-%m', created_at) = strftime('%Y-%m', CURRENT_TIMESTAMP)
-                                                ORDER BY created_at DESC LIMIT 1
-                                            """
-                                            cursor.execute(query, (channel_id,))
-                                            row = cursor.fetchone()
-                                            cursor.close()
-                                            return row[0] if row and row[0] else None
-                                        return db_handler._execute_with_retry(op)
-                                    
-                                    existing_thread_id = await loop.run_in_executor(None, get_existing_thread_id)
-                                    thread = None
-                                    if existing_thread_id:
-                                        max_retries = 3
-                                        retry_delay = 1
-                                        for attempt in range(max_retries):
-                                            try:
-                                                thread = await self.fetch_channel(existing_thread_id)
-                                                break
-                                            except discord.NotFound:
-                                                self.logger.warning(f"Thread {existing_thread_id} not found, will create new one")
-                                                break
-                                            except (discord.HTTPException, discord.Forbidden) as e:
-                                                if attempt < max_retries - 1:
-                                                    self.logger.warning(f"Error fetching thread {existing_thread_id} (attempt {attempt + 1}/{max_retries}): {e}")
-                                                    await asyncio.sleep(retry_delay * (attempt + 1))
-                                                else:
-                                                    self.logger.error(f"Failed to fetch thread {existing_thread_id} after {max_retries} attempts: {e}")
-                                                    return
-                                    
-                                    # Create new thread if we don't have one yet (either no existing_thread_id or failed to fetch)
-                                    if not thread:
-                                        self.logger.info(f"No existing thread found for channel {channel_id}, creating new one")
-                                        thread_title = f"#{channel_obj.name} - Monthly Summary - {current_date.strftime('%B, %Y')}"
-                                        self.logger.info(f"Attempting to send header message with title: {thread_title}")
-                                        summary_message = await self.safe_send_message(channel_obj, f"Summary thread for {current_date.strftime('%B, %Y')}")
-                                        if summary_message:
-                                            self.logger.info(f"Header message sent to channel {channel_id}. Attempting to create a new thread with title: {thread_title}")
-                                            thread = await self.create_summary_thread(summary_message, thread_title)
-                                            if thread:
-                                                self.logger.info(f"Successfully created summary thread for channel {channel_id}: {thread.id}")
-                                                await loop.run_in_executor(None, db_handler.update_summary_thread, channel_id, thread.id)
-                                            else:
-                                                self.logger.error(f"Failed to create thread for channel {channel_id} - create_summary_thread returned None")
-                                        else:
-                                            self.logger.error(f"Failed to send header message to channel {channel_id}")
-                                    
-                                    if thread:
-                                        self.logger.info(f"Using summary thread in channel {post_channel_id}: {thread.id}")
-                                        # Post date headline first and capture the header message
-                                        date_headline = f"# {current_date.strftime('%A, %B %d, %Y')}\n"
-                                        header_msg = await self.safe_send_message(thread, date_headline)
-                                        await asyncio.sleep(1)
-                                        # Post each portion of the summary
-                                        for item in formatted_summary:
-                                            if item.get('type') == 'media_reference':
-                                                try:
-                                                    source_channel_id = int(item['channel_id'])
-                                                    message_id_to_fetch = int(item['message_id'])
-                                                    
-                                                    # Fetch the source channel
-                                                    source_channel = await self._get_channel_with_retry(source_channel_id)
-                                                    if not source_channel:
-                                                        self.logger.warning(f"Could not find source channel {source_channel_id} for media message {message_id_to_fetch}")
-                                                        continue
-
-                                                    # Fetch the original message
-                                                    try:
-                                                        original_message = await source_channel.fetch_message(message_id_to_fetch)
-                                                    except discord.NotFound:
-                                                        self.logger.warning(f"Original message {message_id_to_fetch} not found in channel {source_channel_id}.")
-                                                        continue
-                                                    except discord.Forbidden:
-                                                        self.logger.error(f"Forbidden to fetch message {message_id_to_fetch} from channel {source_channel_id}.")
-                                                        continue
-                                                    except discord.HTTPException as e:
-                                                        self.logger.error(f"HTTP error fetching message {message_id_to_fetch}: {e}")
-                                                        continue
-
-                                                    # Post attachments if they exist
-                                                    if original_message.attachments:
-                                                        for attachment in original_message.attachments:
-                                                            await self.safe_send_message(thread, attachment.url)
-                                                            await asyncio.sleep(0.5) # Small delay between attachments
-                                                    else:
-                                                        self.logger.info(f"Message {message_id_to_fetch} referenced for media has no attachments.")
-
-                                                except Exception as e:
-                                                    self.logger.error(f"Error processing media reference {item}: {e}")
-                                                    self.logger.debug(traceback.format_exc())
-                                            else:
-                                                # Send as regular text content
-                                                await self.safe_send_message(thread, item.get('content', ''))
-                                                await asyncio.sleep(1)
-                                        
-                                        # Post top gens for the specific channel into this thread
-                                        await self.top_generations.post_top_gens_for_channel(thread, channel_id)
-                                        # Generate and post short summary with link back using the header message's id
-                                        short_summary = await self.news_summarizer.generate_short_summary(channel_summary, len(messages))
-                                        link = f"https://discord.com/channels/{channel_obj.guild.id}/{thread.id}/{header_msg.id}"
-                                        await self.safe_send_message(thread, f"\n---\n\n***Click here to jump to the beginning of today's summary:***{link}")
-                                        channel_header = f"**### Channel summary for {current_date.strftime('%A, %B %d, %Y')}**"
-                                        await self.safe_send_message(channel_obj, f"{channel_header}{short_summary}\n[Click here to jump to the summary thread]({link})")
-                                    else:
-                                        self.logger.error(f"Failed to create or fetch thread for channel {channel_id}")
-                            
-                            # Store it in DB
-                            success = await self._post_summary_with_transaction(
-                                channel_id,
-                                channel_summary,
-                                messages,
-                                current_date,
-                                db_handler
+                    # Load every channel's history up front, concurrently, rather than one at a time
+                    histories = await self.fetch_all_histories([c['channel_id'] for c in active_channels])
+                    
+                    # Summarize every channel before posting so the Claude calls can share a batch job
+                    summaries = await self.news_summarizer.generate_news_summaries(histories, use_batches=use_batches)
+                    short_summaries = await self.news_summarizer.generate_short_summaries({
+                        cid: (summary, len(histories[cid]))
+                        for cid, summary in summaries.items()
+                        if summary and summary not in ["[NOTHING OF NOTE]", "[NO SIGNIFICANT NEWS]", "[NO MESSAGES TO ANALYZE]"]
+                    }, use_batches=use_batches)
+                    
+                    # Post channels concurrently (bounded for Discord rate limits); gather keeps channel order
+                    channel_semaphore = asyncio.Semaphore(5)
+
+                    async def process(channel_info):
+                        async with channel_semaphore:
+                            return await self._process_channel(
+                                channel_info, histories, summaries, short_summaries, current_date, db_handler
                             )
-                            if success:
-                                channel_summaries.append(channel_summary)
-                        except Exception as e:
-                            self.logger.error(f"Error processing channel {channel_id}: {e}")
-                            self.logger.debug(traceback.format_exc())
-                            continue
+
+                    results = await asyncio.gather(*(process(c) for c in active_channels), return_exceptions=True)
+                    for channel_info, result in zip(active_channels, results):
+                        if isinstance(result, Exception):
+                            self.logger.error(f"Error processing channel {channel_info['channel_id']}: {result}")
+                        elif result:
+                            channel_summaries.append(result)
 
                     # Combine them
                     if channel_summaries:
@@ -1169,46 +1423,7 @@ class ChannelSummarizer(BaseDiscordBot):
                                 self.logger.error("Failed to post header message; first_message remains unset.")
                             
                             self.logger.info("Posting main summary to summary channel")
-                            for item in formatted_summary:
-                                if item.get('type') == 'media_reference':
-                                    try:
-                                        source_channel_id = int(item['channel_id'])
-                                        message_id_to_fetch = int(item['message_id'])
-
-                                        # Fetch the source channel
-                                        source_channel = await self._get_channel_with_retry(source_channel_id)
-                                        if not source_channel:
-                                            self.logger.warning(f"Could not find source channel {source_channel_id} for media message {message_id_to_fetch}")
-                                            continue
-
-                                        # Fetch the original message
-                                        try:
-                                            original_message = await source_channel.fetch_message(message_id_to_fetch)
-                                        except discord.NotFound:
-                                            self.logger.warning(f"Original message {message_id_to_fetch} not found in channel {source_channel_id}.")
-                                            continue
-                                        except discord.Forbidden:
-                                            self.logger.error(f"Forbidden to fetch message {message_id_to_fetch} from channel {source_channel_id}.")
-                                            continue
-                                        except discord.HTTPException as e:
-                                            self.logger.error(f"HTTP error fetching message {message_id_to_fetch}: {e}")
-                                            continue
-
-                                        # Post attachments if they exist
-                                        if original_message.attachments:
-                                            for attachment in original_message.attachments:
-                                                await self.safe_send_message(summary_channel, attachment.url)
-                                                await asyncio.sleep(0.5) # Small delay between attachments
-                                        else:
-                                            self.logger.info(f"Message {message_id_to_fetch} referenced for media has no attachments.")
-
-                                    except Exception as e:
-                                        self.logger.error(f"Error processing media reference {item}: {e}")
-                                        self.logger.debug(traceback.format_exc())
-                                else:
-                                    # Send as regular text content
-                                    await self.safe_send_message(summary_channel, item.get('content', ''))
-                                    await asyncio.sleep(1)
+                            await self._post_formatted_summary(summary_channel, formatted_summary)
                         else:
                             await self.safe_send_message(summary_channel, "_No significant activity to summarize in the last 24 hours._")
                     else:
@@ -1237,32 +1452,24 @@ class ChannelSummarizer(BaseDiscordBot):
 
         except Exception as e:
             self.logger.error(f"Critical error in summary generation: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Traceback:", exc_info=True)
             raise
+        finally:
+            self._run_date = None
 
     async def _get_dev_mode_channels(self, db_handler):
         """Get active channels for dev mode"""
         try:
-            # Get source channel (where to pull messages from)
-            test_channel_str = os.getenv('TEST_DATA_CHANNEL', '')
-            if not test_channel_str:
-                self.logger.warning("TEST_DATA_CHANNEL not configured")
-                return []
-                
-            test_channel_ids = [int(cid.strip()) for cid in test_channel_str.split(',') if cid.strip()]
+            # Get source channel (where to pull messages from), parsed once in load_config
+            test_channel_ids = self.test_data_channel_ids
             if not test_channel_ids:
-                self.logger.warning("No test channels configured")
+                self.logger.warning("TEST_DATA_CHANNEL not configured")
                 return []
 
             # Get destination channels (where to post summaries)
-            dev_channels_str = os.getenv('DEV_CHANNELS_TO_MONITOR', '')
-            if not dev_channels_str:
-                self.logger.warning("DEV_CHANNELS_TO_MONITOR not configured")
-                return []
-
-            dev_channel_ids = [int(cid.strip()) for cid in dev_channels_str.split(',') if cid.strip()]
+            dev_channel_ids = self.dev_channels_to_monitor
             if not dev_channel_ids:
-                self.logger.warning("No dev channels configured")
+                self.logger.warning("DEV_CHANNELS_TO_MONITOR not configured")
                 return []
                 
             self.logger.debug(f"Source channel IDs (TEST_DATA_CHANNEL): {test_channel_ids}")
@@ -1308,19 +1515,25 @@ class ChannelSummarizer(BaseDiscordBot):
     async def _get_production_channels(self, db_handler):
         """Get active channels for production mode"""
         try:
-            channel_ids = ",".join(str(cid) for cid in self.channels_to_monitor)
-            channel_query = (
-                "SELECT c.channel_id, c.channel_name, COALESCE(c2.channel_name, 'Unknown') as source, "
-                "COUNT(m.message_id) as msg_count "
-                "FROM channels c "
-                "LEFT JOIN channels c2 ON c.category_id = c2.channel_id "
-                "LEFT JOIN messages m ON c.channel_id = m.channel_id "
-                "AND m.created_at > datetime('now', '-24 hours') "
-                f"WHERE c.channel_id IN ({channel_ids}) OR c.category_id IN ({channel_ids}) "
-                "GROUP BY c.channel_id, c.channel_name, source "
-                "HAVING COUNT(m.message_id) >= 25 "
-                "ORDER BY msg_count DESC"
-            )
+            monitored = tuple(self.channels_to_monitor)
+            if self._production_query_cache and self._production_query_cache[0] == monitored:
+                channel_query = self._production_query_cache[1]
+            else:
+                # Categories are expanded to their channels in SQL via category_id
+                channel_ids = ",".join(str(cid) for cid in monitored)
+                channel_query = (
+                    "SELECT c.channel_id, c.channel_name, COALESCE(c2.channel_name, 'Unknown') as source, "
+                    "COUNT(m.message_id) as msg_count "
+                    "FROM channels c "
+                    "LEFT JOIN channels c2 ON c.category_id = c2.channel_id "
+                    "LEFT JOIN messages m ON c.channel_id = m.channel_id "
+                    "AND m.created_at > datetime('now', '-24 hours') "
+                    f"WHERE c.channel_id IN ({channel_ids}) OR c.category_id IN ({channel_ids}) "
+                    "GROUP BY c.channel_id, c.channel_name, source "
+                    "HAVING COUNT(m.message_id) >= 25 "
+                    "ORDER BY msg_count DESC"
+                )
+                self._production_query_cache = (monitored, channel_query)
             
             loop = asyncio.get_running_loop()
             def db_operation():
@@ -1366,8 +1579,12 @@ class ChannelSummarizer(BaseDiscordBot):
             self.logger.error(f"Error registering events: {e}")
             self.logger.error(traceback.format_exc())
 
+    def _get_run_date(self) -> datetime:
+        """The current summary run's timestamp, or now when called outside a run."""
+        return self._run_date or datetime.utcnow()
+
     def _get_today_str(self):
-        return datetime.utcnow().strftime("%Y-%m-%d")
+        return self._get_run_date().strftime("%Y-%m-%d")
 
 if __name__ == "__main__":
     def main():
@@ -2,23 +2,28 @@
 
 import asyncio
 import os
-import traceback
+import random
 from datetime import datetime, timedelta
 import time
 from discord.ext import commands
 
 MAX_RETRIES = 3
 READY_TIMEOUT = 30
-INITIAL_RETRY_DELAY = 5
-MAX_RETRY_WAIT = 300  # 5 minutes
+INITIAL_RETRY_DELAY = 300  # 5 minutes
+MAX_RETRY_WAIT = 3600  # 1 hour
+RETRY_JITTER = 30
 
 class SummarizerCog(commands.Cog):
-    def __init__(self, bot, logger, dev_mode=False, run_now=False):
+    def __init__(self, bot, logger, dev_mode=False, run_now=False, batch=False):
         self.bot = bot
         self.logger = logger
         self.dev_mode = dev_mode
         self.run_now = run_now
+        # Scheduled runs may use the Message Batches API; immediate/manual runs stay synchronous
+        self.batch = batch
         self._shutdown_flag = False
+        # Set to wake the scheduler early, either to run a summary now or to shut down
+        self._wake_event = asyncio.Event()
         # If your summarizer logic used to store references to e.g. Claude, DB, etc.
         # you can keep them here. For example:
         self.logger.info("Initializing SummarizerCog...")
@@ -66,21 +71,38 @@ class SummarizerCog(commands.Cog):
         
         self.logger.info("SummarizerCog on_ready triggered...")
         
-        # If user requested immediate summary via --summary-now
-        if self.run_now and not getattr(self, '_immediate_summary_run', False):
-            try:
-                self.logger.info("Running immediate summary generation...")
-                await asyncio.sleep(2)  # slight delay
-                await self.generate_summary()
-            except Exception as e:
-                self.logger.error(f"Error during immediate summary: {e}")
-                self.logger.debug(traceback.format_exc())
-            self._immediate_summary_run = True
-        
         # Start scheduled daily summary loop
         self._shutdown_flag = False
         self.logger.info("Starting scheduled daily summary loop...")
         self.bot.loop.create_task(self.schedule_daily_summary())
+        
+        # If user requested immediate summary via --summary-now, wake the scheduler to run it
+        if self.run_now and not getattr(self, '_immediate_summary_run', False):
+            self.logger.info("Requesting immediate summary generation...")
+            await asyncio.sleep(2)  # slight delay
+            self.request_summary()
+            self._immediate_summary_run = True
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.channel_summarizer.invalidate_channel(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.channel_summarizer.invalidate_channel(channel.id)
+
+    def request_summary(self):
+        """Wake the scheduler so it runs a summary now instead of waiting for 10:00 UTC."""
+        self._wake_event.set()
+
+    async def _sleep_until_woken(self, delay: float) -> bool:
+        """Sleep for delay seconds; return True if the scheduler was woken early."""
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            return False
+        self._wake_event.clear()
+        return True
 
     async def schedule_daily_summary(self):
         """
@@ -103,10 +125,11 @@ class SummarizerCog(commands.Cog):
                 )
 
                 try:
-                    await asyncio.sleep(delay)
+                    woken = await self._sleep_until_woken(delay)
                     if not self._shutdown_flag:
-                        self.logger.info("Starting scheduled summary generation")
-                        await self.generate_summary()
+                        # Requested runs stay synchronous; only the 10:00 UTC run may use batches
+                        self.logger.info("Starting requested summary generation" if woken else "Starting scheduled summary generation")
+                        await self.generate_summary(use_batches=self.batch and not woken)
                         retry_count = 0
                         self.logger.info("Scheduled summary generation completed successfully")
                 except asyncio.CancelledError:
@@ -123,28 +146,33 @@ class SummarizerCog(commands.Cog):
                         self.logger.error(f"Summary generation attempt {retry_count}/{MAX_RETRIES} failed: {e}")
                         if retry_count >= MAX_RETRIES:
                             self.logger.error(
-                                f"Failed after {MAX_RETRIES} attempts - shutting down scheduler"
+                                f"Failed after {MAX_RETRIES} attempts - waiting for the next scheduled run"
                             )
-                            self._shutdown_flag = True
-                            raise
-                        wait_time = min(INITIAL_RETRY_DELAY * (2 ** retry_count), MAX_RETRY_WAIT)
-                        self.logger.info(f"Retrying in {wait_time/3600:.1f} hours")
-                        await asyncio.sleep(wait_time)
+                            retry_count = 0
+                            continue
+                        # Back off before falling through to the next 10:00 UTC slot; a failed run
+                        # isn't retried straight away because generate_summary re-posts everything.
+                        # Jitter so a recovering provider isn't hit at the same instant every time.
+                        wait_time = min(INITIAL_RETRY_DELAY * 2 ** (retry_count - 1), MAX_RETRY_WAIT) + random.uniform(0, RETRY_JITTER)
+                        self.logger.info(f"Backing off for {wait_time:.0f} seconds")
+                        if await self._sleep_until_woken(wait_time):
+                            # Don't swallow a summary requested during the backoff
+                            self.request_summary()
 
         except Exception as e:
             self.logger.error(f"Fatal error in schedule_daily_summary: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.debug("Full traceback", exc_info=True)
             self._shutdown_flag = True
             # In a real scenario, you might want to shut down the bot, or just the scheduling
 
-    async def generate_summary(self):
+    async def generate_summary(self, use_batches: bool = False):
         """
         The method that actually performs the summarization logic.
         Copied/adapted from your original ChannelSummarizer code, including
         your logic for searching channels, building summary messages, etc.
         """
         self.logger.info("Running the full summarization using ChannelSummarizer...")
-        await self.channel_summarizer.generate_summary()
+        await self.channel_summarizer.generate_summary(use_batches=use_batches)
         self.logger.info("Finished ChannelSummarizer's generate_summary.")
 
     async def cleanup(self):
@@ -153,6 +181,8 @@ class SummarizerCog(commands.Cog):
         manual shutdown for your summarizer tasks.
         """
         self.logger.info("Starting cleanup for SummarizerCog...")
+        self._shutdown_flag = True
+        self._wake_event.set()
         # e.g. close DB connections, etc.
 
     @commands.command(name='manual_summary')
@@ -181,9 +211,10 @@ async def setup(bot: commands.Bot):
 
     # Retrieve summary_now flag from the bot object (added in main.py)
     run_now_flag = getattr(bot, 'summary_now', False) # Use getattr for safety
+    batch_flag = getattr(bot, 'batch_summaries', False)
 
     # run_now is typically controlled by command-line args in main.py,
     # so we likely don't pass it here, or default it to False.
     # The cog's internal logic seems to handle its run_now state based on initialization.
-    await bot.add_cog(SummarizerCog(bot, logger, dev_mode=dev_mode, run_now=run_now_flag)) # Pass the retrieved flag
+    await bot.add_cog(SummarizerCog(bot, logger, dev_mode=dev_mode, run_now=run_now_flag, batch=batch_flag)) # Pass the retrieved flags
     logger.info(f"SummarizerCog added to bot (run_now={run_now_flag}).") # Log the value passed